@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .profiling import count_connection
+        connection_created.connect(count_connection)
+        if settings.API_PROFILING['ENABLED']:
+            from .profiling import install_serializer_timer
+            install_serializer_timer()
@@ -0,0 +1,83 @@
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+
+from recipes.cache import get_version
+from recipes.models import Ingredient
+
+
+def search_ingredients(query, limit):
+    """Сначала совпадения по началу названия, затем по вхождению."""
+    return Ingredient.objects.filter(name__icontains=query).annotate(
+        rank=Case(
+            When(name__istartswith=query, then=Value(0)),
+            default=Value(1), output_field=IntegerField())
+    ).order_by('rank', 'name').values('id', 'name', 'measurement_unit')[
+        :limit]
+
+
+class IngredientPrefixIndex:
+    """Отсортированный массив названий ингредиентов в памяти процесса.
+
+    Начало названия ищется бинарным поиском, вхождение - проходом по
+    массиву. Индекс перестраивается, когда меняется версия ингредиентов
+    в кэше. Правки доходят до других процессов, только если кэш общий
+    (memcached в docker-compose); с LocMemCache - лишь до того процесса,
+    где они сделаны.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = ()
+        self._rows = ()
+        self._version = None
+
+    def _build(self):
+        rows = sorted((
+            (name.casefold(), {
+                'id': pk, 'name': name, 'measurement_unit': unit})
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit').order_by()),
+            key=lambda item: (item[0], item[1]['id']))
+        self._keys = tuple(key for key, _ in rows)
+        self._rows = tuple(row for _, row in rows)
+
+    def _ensure_built(self):
+        version = get_version('ingredient')
+        with self._lock:
+            if self._version != version:
+                self._build()
+                self._version = version
+            return self._keys, self._rows
+
+    def search(self, query, limit):
+        keys, rows = self._ensure_built()
+        query = query.casefold()
+        result = []
+        start = bisect_left(keys, query)
+        for position in range(start, len(keys)):
+            if len(result) == limit or not keys[position].startswith(query):
+                break
+            result.append(rows[position])
+        if len(result) < limit:
+            for key, row in zip(keys, rows):
+                if query in key and not key.startswith(query):
+                    result.append(row)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def autocomplete(query):
+    options = settings.INGREDIENT_AUTOCOMPLETE
+    query = query.strip()
+    if not query:
+        return []
+    if len(query) <= options['MEMORY_PREFIX_LENGTH']:
+        return ingredient_index.search(query, options['LIMIT'])
+    return list(search_ingredients(query, options['LIMIT']))
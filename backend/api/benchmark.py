@@ -0,0 +1,329 @@
+import asyncio
+import base64
+import io
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Count
+from django.core.handlers.wsgi import WSGIHandler
+from django.test.client import AsyncRequestFactory, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.handlers import ReadPoolASGIHandler
+from api.profiling import connects
+from recipes.cache import bump_version
+from recipes.cart import rebuild_cart_items
+from recipes.counters import recount
+from recipes.feed import rebuild_feeds
+from recipes.models import (
+    Favorite, Follow, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+    ShoppingList, Tag)
+from users.models import User
+
+BATCH_SIZE = 2000
+
+
+def bulk_create(model, objects):
+    """bulk_create, возвращающий строки с id на любой СУБД."""
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    return list(model.objects.order_by('id'))
+
+
+def small_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), '#c0ffee').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+def generate_data(recipes_count, seed=0):
+    """Создаёт согласованный набор данных через bulk_create.
+
+    Пользователей в 10 раз меньше, чем рецептов. У рецепта 8 ингредиентов
+    и 2 тега, каждый пользователь подписан на 10 авторов и добавил по
+    20 рецептов в избранное и 5 в список покупок.
+    """
+    rng = random.Random(seed)
+    password = make_password('benchmark')
+    users = bulk_create(User, (
+        User(email=f'bench{i}@example.com', username=f'bench{i}',
+             first_name='Bench', last_name=str(i), password=password)
+        for i in range(max(recipes_count // 10, 2))))
+    tags = bulk_create(Tag, (
+        Tag(name=f'Тег {i}', color=f'#{i:06x}', slug=f'tag{i}')
+        for i in range(6)))
+    ingredients = bulk_create(Ingredient, (
+        Ingredient(name=f'ингредиент {i:05}', measurement_unit='г')
+        for i in range(2000)))
+    recipes = bulk_create(Recipe, (
+        Recipe(author=rng.choice(users), name=f'Рецепт {i}',
+               image='media/benchmark.png', text='Описание ' * 20,
+               cooking_time=rng.randint(1, 120))
+        for i in range(recipes_count)))
+    RecipeIngredient.objects.bulk_create((
+        RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                         amount=rng.randint(1, 500))
+        for recipe in recipes
+        for ingredient in rng.sample(ingredients, 8)), batch_size=BATCH_SIZE)
+    RecipeTag.objects.bulk_create((
+        RecipeTag(recipe=recipe, tag=tag)
+        for recipe in recipes for tag in rng.sample(tags, 2)),
+        batch_size=BATCH_SIZE)
+    Follow.objects.bulk_create((
+        Follow(user=user, author=author)
+        for user in users
+        for author in rng.sample(users, min(10, len(users)))
+        if author != user), batch_size=BATCH_SIZE)
+    for model, per_user in ((Favorite, 20), (ShoppingList, 5)):
+        model.objects.bulk_create((
+            model(user=user, recipe=recipe)
+            for user in users
+            for recipe in rng.sample(recipes, min(per_user, len(recipes)))),
+            batch_size=BATCH_SIZE)
+    recount()
+    rebuild_cart_items()
+    rebuild_feeds()
+    bump_version('tag')
+    bump_version('ingredient')
+    return users, tags, ingredients, recipes
+
+
+def get_scenarios(users, tags, ingredients, recipes, seed=0):
+    """Пары (название, функция запроса) для горячих эндпоинтов."""
+    rng = random.Random(seed)
+    user = User.objects.annotate(
+        follows=Count('follower')).order_by('-follows').first()
+    author = recipes[0].author
+    recipe = recipes[len(recipes) // 2]
+    image = small_image()
+
+    def payload():
+        return {
+            'name': 'Новый рецепт', 'text': 'Описание',
+            'cooking_time': 30, 'image': image,
+            'tags': [tag.id for tag in tags[:2]],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 100}
+                for ingredient in rng.sample(ingredients, 8)]}
+
+    created = []
+
+    def create(client):
+        response = client.post('/api/recipes/', payload(), format='json')
+        created.append(response.data['id'])
+        return response
+
+    def update(client):
+        return client.patch(
+            f'/api/recipes/{created[-1]}/', payload(), format='json')
+
+    return user, (
+        ('recipes', lambda client: client.get('/api/recipes/')),
+        ('recipes?tags', lambda client: client.get(
+            f'/api/recipes/?tags={tags[0].slug}&tags={tags[1].slug}')),
+        ('recipes?author', lambda client: client.get(
+            f'/api/recipes/?author={author.id}')),
+        ('recipes?is_favorited', lambda client: client.get(
+            '/api/recipes/?is_favorited=1')),
+        ('recipe detail', lambda client: client.get(
+            f'/api/recipes/{recipe.id}/')),
+        ('subscriptions', lambda client: client.get(
+            '/api/users/subscriptions/?recipes_limit=3')),
+        ('feed', lambda client: client.get('/api/recipes/feed/')),
+        ('ingredient search', lambda client: client.get(
+            '/api/ingredients/?name=ингредиент 01')),
+        ('download_shopping_cart', lambda client: client.get(
+            '/api/recipes/download_shopping_cart/')),
+        ('shopping_cart summary', lambda client: client.get(
+            '/api/recipes/shopping_cart/')),
+        ('recipe create', create),
+        ('recipe update', update),
+    )
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(request, client, repeat):
+    """Время и запросы за repeat вызовов, пик памяти - отдельным вызовом.
+
+    tracemalloc заметно замедляет код, поэтому в замер времени не входит.
+    """
+    timings, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            consume(request(client))
+            timings.append(time.perf_counter() - started)
+        queries.append(len(context))
+    tracemalloc.start()
+    consume(request(client))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'queries': round(statistics.mean(queries), 1),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def consume(response):
+    assert response.status_code < 400, (
+        response.status_code, getattr(response, 'data', None))
+    if response.streaming:
+        b''.join(response.streaming_content)
+
+
+def run_benchmark(recipes_count, repeat):
+    started = time.perf_counter()
+    data = generate_data(recipes_count)
+    generated = time.perf_counter() - started
+    user, scenarios = get_scenarios(*data)
+    client = APIClient()
+    client.force_authenticate(user)
+    return {
+        'recipes': recipes_count,
+        'generate_s': round(generated, 2),
+        'scenarios': {
+            name: measure(request, client, repeat)
+            for name, request in scenarios},
+    }
+
+
+def read_paths(recipes):
+    """GET-запросы для сравнения WSGI и ASGI, по кругу."""
+    return (
+        '/api/recipes/',
+        f'/api/recipes/{recipes[len(recipes) // 2].id}/',
+        '/api/tags/',
+        '/api/ingredients/?name=ингредиент 01',
+        '/api/recipes/download_shopping_cart/',
+    )
+
+
+def call_wsgi(handler, path, token):
+    statuses = []
+    response = handler(
+        RequestFactory().get(
+            path, HTTP_AUTHORIZATION=f'Token {token}').environ,
+        lambda status, response_headers: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+async def call_asgi(application, path, token):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(
+        AsyncRequestFactory().get(
+            path, authorization=f'Token {token}').scope, receive, send)
+    return messages[0]['status']
+
+
+def summarize(timings, elapsed):
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+    }
+
+
+def run_wsgi(paths, token, concurrency):
+    handler = WSGIHandler()
+
+    def request(path):
+        started = time.perf_counter()
+        status = call_wsgi(handler, path, token)
+        assert status < 400, (path, status)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(request, paths))
+    return summarize(timings, time.perf_counter() - started)
+
+
+def run_asgi(paths, token, concurrency):
+    application = ReadPoolASGIHandler()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(path):
+            async with semaphore:
+                started = time.perf_counter()
+                status = await call_asgi(application, path, token)
+                assert status < 400, (path, status)
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(request(path) for path in paths))
+        return summarize(timings, time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+def run_connection_benchmark(token, requests_count):
+    """/api/tags/ через WSGI без постоянных соединений и с ними.
+
+    connects - сколько раз открывалось соединение с БД: при
+    CONN_MAX_AGE=0 на каждый запрос, при постоянном - один раз.
+    Тестовая база SQLite в памяти не закрывается, разница видна
+    только на PostgreSQL.
+    """
+    settings_dict = connection.settings_dict
+    old_max_age = settings_dict['CONN_MAX_AGE']
+    results = {}
+    try:
+        for max_age in (0, 60):
+            settings_dict['CONN_MAX_AGE'] = max_age
+            connection.close()
+            connects.clear()
+            result = run_wsgi(['/api/tags/'] * requests_count, token, 1)
+            result['connects'] = connects[connection.alias]
+            results[f'conn_max_age={max_age}'] = result
+    finally:
+        settings_dict['CONN_MAX_AGE'] = old_max_age
+    return results
+
+
+def run_server_benchmark(recipes_count, concurrency_levels, requests_count):
+    """Пропускная способность WSGI и ASGI на одних и тех же GET-запросах.
+
+    Оба обработчика вызываются в процессе, без HTTP-сервера: WSGI -
+    из пула потоков размером concurrency, ASGI - из event loop с тем же
+    числом одновременных запросов.
+    """
+    users, tags, ingredients, recipes = generate_data(recipes_count)
+    user = ShoppingList.objects.values('user').first()['user']
+    token = Token.objects.get_or_create(user_id=user)[0].key
+    base = read_paths(recipes)
+    paths = [base[i % len(base)] for i in range(requests_count)]
+    results = []
+    for concurrency in concurrency_levels:
+        results.append({
+            'concurrency': concurrency,
+            'wsgi': run_wsgi(paths, token, concurrency),
+            'asgi': run_asgi(paths, token, concurrency),
+        })
+    return {'recipes': recipes_count, 'requests': requests_count,
+            'runs': results,
+            'connections': run_connection_benchmark(token, requests_count)}
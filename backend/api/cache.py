@@ -0,0 +1,43 @@
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache import get_cache, get_version
+
+
+class CachedListMixin:
+    """Кэширует готовый JSON списка до изменения модели.
+
+    Ключ содержит версию cache_version_name, которую сигналы
+    post_save/post_delete увеличивают. По ETag клиент получает 304.
+    """
+
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        key = 'api:response:{}:{}:{}'.format(
+            self.cache_version_name,
+            get_version(self.cache_version_name),
+            hashlib.md5(
+                request.get_full_path().encode()).hexdigest())
+        cached = cache.get(key)
+        if cached is None:
+            data = super().list(request, *args, **kwargs).data
+            content = JSONRenderer().render(data)
+            cached = (
+                quote_etag(hashlib.md5(content).hexdigest()), content)
+            cache.set(key, cached, settings.API_RESPONSE_CACHE_TIMEOUT)
+        etag, content = cached
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                content, content_type='application/json')
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,65 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from recipes.cache import get_modified
+from recipes.relations import relations_changed_at
+
+
+def get_validators(request, modified, content):
+    """ETag и Last-Modified ответа с рецептами.
+
+    modified - время изменения самих рецептов, content - то, что
+    отличает ответ, например id и updated_at рецептов страницы. Ответ
+    зависит ещё от тегов, ингредиентов и профилей авторов, а для
+    пользователя - от его избранного, корзины и подписок.
+
+    Last-Modified хранит целые секунды, поэтому время округляется
+    вверх, а пока эта секунда не прошла, Last-Modified не отдаётся:
+    изменение в ту же секунду не должно давать 304 по
+    If-Modified-Since. ETag строится по точному времени.
+    """
+    timestamps = [modified, get_modified('recipe_metadata')]
+    if request.user.is_authenticated:
+        timestamps.append(relations_changed_at(request.user.id))
+    source = repr((
+        request.get_full_path(), request.accepted_renderer.format,
+        request.user.id, timestamps, content))
+    last_modified = math.ceil(max(timestamps))
+    if last_modified > time.time():
+        last_modified = None
+    return (quote_etag(hashlib.md5(source.encode()).hexdigest()),
+            last_modified)
+
+
+def set_validators(request, response, etag, last_modified):
+    """Заголовки условного GET и политика кэширования.
+
+    Ответы анонимам одинаковы для всех, их можно держать в nginx и
+    браузере ANONYMOUS_CACHE_MAX_AGE секунд; ответы пользователю
+    браузер должен каждый раз проверять по ETag.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.ANONYMOUS_CACHE_MAX_AGE)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_response(request, etag, last_modified):
+    """304, если у клиента актуальная версия, иначе None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return set_validators(request, response, etag, last_modified)
+    return None
@@ -1,7 +1,46 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from recipes.cache import get_cache, get_version
+from recipes.models import Recipe, RecipeTag, Tag
+from recipes.search import search_recipes
+
+
+def get_tag_ids(slugs):
+    """id тегов по слагам из кэша, который сбрасывают сигналы Tag."""
+    cache = get_cache()
+    key = f'api:tag-slugs:{get_version("tag")}'
+    slug_map = cache.get(key)
+    if slug_map is None:
+        slug_map = dict(Tag.objects.exclude(slug=None).values_list(
+            'slug', 'id'))
+        cache.set(key, slug_map, None)
+    return [slug_map[slug] for slug in slugs if slug in slug_map]
+
+
+class MultipleValueField(forms.Field):
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [item for item in value or () if item]
+
+
+class TagSlugFilter(filters.Filter):
+    """Рецепты хотя бы с одним из тегов ?tags=a&tags=b.
+
+    Фильтрует через EXISTS по recipes_recipetag без JOIN с тегами,
+    поэтому рецепты не дублируются и DISTINCT не нужен.
+    """
+
+    field_class = MultipleValueField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=get_tag_ids(value))))
 
 
 class IngredientSearchFilter(SearchFilter):
@@ -9,15 +48,16 @@ class IngredientSearchFilter(SearchFilter):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug')
+    tags = TagSlugFilter()
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -28,3 +68,8 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(in_shoppinglists__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if value.strip():
+            return search_recipes(queryset, value)
+        return queryset
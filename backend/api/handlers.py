@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+from .profiling import profile_queries
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+
+
+def get_read_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_POOL['THREADS'],
+            thread_name_prefix='asgi-read')
+    return _executor
+
+
+def run_read_view(view, request, *args, **kwargs):
+    """Выполняет view и рендерит ответ в потоке пула.
+
+    Потоки пула живут дольше запроса, поэтому соединения с БД
+    закрываются здесь, а не сигналами request_started/finished.
+    Запросы к БД учитываются в профиле QueryProfilingMiddleware.
+    """
+    close_old_connections()
+    try:
+        with profile_queries():
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def read_parts(iterator, size):
+    """Следующие части потокового ответа общим объёмом от size байт."""
+    parts, total = [], 0
+    for part in iterator:
+        parts.append(part)
+        total += len(part)
+        if total >= size:
+            break
+    return parts
+
+
+class ReadPoolASGIHandler(ASGIHandler):
+    """ASGI-обработчик, который выполняет чтение в ограниченном пуле потоков.
+
+    Под ASGI Django 3.2 запускает синхронные view с thread_sensitive=True,
+    то есть по очереди в одном общем потоке. GET, HEAD и OPTIONS уходят
+    в пул из ASGI_READ_POOL['THREADS'] потоков и идут параллельно,
+    запись остаётся в общем потоке. Потоковые ответы тоже читаются
+    в общем потоке.
+    """
+
+    def make_view_atomic(self, view):
+        view = super().make_view_atomic(view)
+        if asyncio.iscoroutinefunction(view):
+            return view
+
+        async def pooled_view(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await sync_to_async(view, thread_sensitive=True)(
+                    request, *args, **kwargs)
+            return await sync_to_async(
+                run_read_view, thread_sensitive=False,
+                executor=get_read_executor())(view, request, *args, **kwargs)
+
+        return pooled_view
+
+    async def send_response(self, response, send):
+        """Отправляет ответ, читая потоковый ответ вне event loop.
+
+        Django 3.2 перебирает потоковый ответ прямо в event loop, и
+        генератор с запросами к БД (например, потоковый экспорт из
+        админки) падает с SynchronousOnlyOperation. Здесь части ответа
+        читаются пачками от chunk_size байт в общем синхронном потоке,
+        где выполняются и view, поэтому курсор остаётся в одном
+        соединении.
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values())
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        iterator = iter(response)
+        read = sync_to_async(read_parts, thread_sensitive=True)
+        while True:
+            parts = await read(iterator, self.chunk_size)
+            if not parts:
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': b''.join(parts),
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
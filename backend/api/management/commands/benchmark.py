@@ -0,0 +1,68 @@
+import json
+import subprocess
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment)
+
+from api.benchmark import run_benchmark
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95, число SQL-запросов и пик памяти горячих '
+            'эндпоинтов на тестовой базе при разных объёмах данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='100,1000',
+            help='Количество рецептов через запятую')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнить каждый запрос')
+        parser.add_argument(
+            '--output', help='Файл для результатов в формате JSON')
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options['scales'].split(',')]
+        results = {'commit': get_commit(), 'database': connection.vendor,
+                   'repeat': options['repeat'], 'runs': []}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root):
+                for scale in scales:
+                    with transaction.atomic():
+                        run = run_benchmark(scale, options['repeat'])
+                        transaction.set_rollback(True)
+                    results['runs'].append(run)
+                    self.write_run(run)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def write_run(self, run):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{run["recipes"]} рецептов '
+            f'(данные созданы за {run["generate_s"]} с)'))
+        for name, result in run['scenarios'].items():
+            self.stdout.write(
+                f'  {name:24} p50={result["p50_ms"]:>8} ms '
+                f'p95={result["p95_ms"]:>8} ms '
+                f'queries={result["queries"]:>6} '
+                f'peak={result["peak_kib"]:>9} KiB')
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+
+from api.benchmark import run_server_benchmark
+from .benchmark import get_commit
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность GET-запросов под WSGI и '
+            'ASGI при разном числе одновременных запросов и стоимость '
+            'открытия соединений с БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Количество рецептов в тестовой базе')
+        parser.add_argument(
+            '--concurrency', default='1,8,32',
+            help='Числа одновременных запросов через запятую')
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов выполнить в каждом режиме')
+        parser.add_argument(
+            '--output', help='Файл для результатов в формате JSON')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        setup_test_environment()
+        # Данные коммитятся: обработчики читают их из других потоков.
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = run_server_benchmark(
+                options['recipes'], levels, options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        results.update(commit=get_commit(), database=connection.vendor)
+        for run in results['runs']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'concurrency={run["concurrency"]}'))
+            for mode in ('wsgi', 'asgi'):
+                result = run[mode]
+                self.stdout.write(
+                    f'  {mode}: {result["rps"]:>8} req/s '
+                    f'p50={result["p50_ms"]:>8} ms '
+                    f'p95={result["p95_ms"]:>8} ms')
+        self.stdout.write(self.style.MIGRATE_HEADING('/api/tags/, WSGI'))
+        for mode, result in results['connections'].items():
+            self.stdout.write(
+                f'  {mode}: {result["rps"]:>8} req/s '
+                f'p50={result["p50_ms"]:>8} ms '
+                f'connects={result["connects"]}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,41 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import ProfileStore
+
+
+class Command(BaseCommand):
+    help = 'Сводка SQL-запросов и времени ответа по представлениям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'log_file', nargs='?', default=settings.API_PROFILING['LOG_FILE'],
+            help='Файл JSON Lines, который пишет QueryProfilingMiddleware')
+        parser.add_argument(
+            '--top', type=int, default=3,
+            help='Сколько повторяющихся запросов показать для view')
+
+    def handle(self, *args, **options):
+        if not options['log_file']:
+            raise CommandError('Не задан API_PROFILING_LOG_FILE.')
+        store = ProfileStore()
+        try:
+            with open(options['log_file'], encoding='utf-8') as file:
+                for line in file:
+                    store.add(json.loads(line))
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {options["log_file"]}')
+        for row in store.report(options['top']):
+            self.stdout.write(
+                f'{row["method"]:6} {row["view"]:32} '
+                f'n={row["requests"]:<6} '
+                f'queries={row["avg_queries"]:<6} '
+                f'max={row["max_queries"]:<5} '
+                f'db={row["avg_db_ms"]}ms '
+                f'serializer={row["avg_serializer_ms"]}ms '
+                f'wall={row["avg_wall_ms"]}ms')
+            for duplicate in row['duplicate_queries']:
+                self.stdout.write(
+                    f'    x{duplicate["count"]} {duplicate["sql"][:150]}')
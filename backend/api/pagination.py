@@ -1,8 +1,115 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, PageNumberPagination, _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from django.conf import settings as conf_settings
+from recipes.feed import feed_page
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = conf_settings.REST_FRAMEWORK['PAGE_SIZE']
+
+
+class CustomCursorPagination(CursorPagination):
+    """Keyset-пагинация без OFFSET и COUNT(*)."""
+    page_size_query_param = 'limit'
+    page_size = conf_settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    def get_ordering(self, request, queryset, view):
+        # Порядок курсора фиксирован и не зависит от ?ordering=.
+        return self.ordering
+
+
+class RecipeCursorPagination(CustomCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class SubscriptionCursorPagination(CustomCursorPagination):
+    ordering = ('-id',)
+
+
+class CursorPaginationMixin:
+    """Включает курсорную пагинацию по ?pagination=cursor.
+
+    Ссылки next/previous сохраняют параметры запроса, поэтому
+    последующие страницы остаются в курсорном режиме. По умолчанию
+    используется постраничная пагинация фронтенда.
+    """
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if (params.get('pagination') == 'cursor'
+                    or 'cursor' in params):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+
+class FeedPagination(BasePagination):
+    """Курсор ленты - (created_at, id) последнего рецепта страницы.
+
+    Лента собирается из нескольких источников, поэтому курсор хранит
+    позицию, а не смещение; листать можно только вперёд.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = conf_settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, recipe_id = base64.urlsafe_b64decode(
+                encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(recipe_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        created_at, recipe_id = position
+        encoded = base64.urlsafe_b64encode(
+            f'{created_at.isoformat()}|{recipe_id}'.encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            encoded)
+
+    def paginate_feed(self, request, user_id):
+        """id рецептов страницы ленты пользователя."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        rows = feed_page(user_id, self.decode_cursor(request), page_size + 1)
+        self.next_link = None
+        if len(rows) > page_size:
+            self.next_link = self.encode_cursor(rows[page_size - 1])
+        return [recipe_id for _, recipe_id in rows[:page_size]]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': None,
+            'results': data,
+        })
@@ -0,0 +1,225 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_current_profile = contextvars.ContextVar('api_profile', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше запросов, чем разрешено."""
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.queries.items() if count > 1}
+
+
+def get_view_name(request):
+    """Имя маршрута (recipes-list) или класса представления."""
+    match = request.resolver_match
+    if match is None:
+        return request.path
+    if match.url_name:
+        return match.url_name
+    view_class = getattr(match.func, 'cls', None)
+    return view_class.__name__ if view_class else match.view_name
+
+
+class ProfileStore:
+    """Агрегированная статистика запросов текущего процесса."""
+
+    FIELDS = ('queries', 'db_time', 'serializer_time', 'wall_time')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._stats = defaultdict(lambda: {
+            'requests': 0, 'max_queries': 0, 'duplicates': Counter(),
+            **{field: 0.0 for field in self.FIELDS}})
+
+    def add(self, record):
+        with self._lock:
+            stats = self._stats[(record['method'], record['view'])]
+            stats['requests'] += 1
+            stats['max_queries'] = max(
+                stats['max_queries'], record['queries'])
+            for field in self.FIELDS:
+                stats[field] += record[field]
+            stats['duplicates'].update(record['duplicates'])
+
+    def report(self, top=5):
+        with self._lock:
+            items = list(self._stats.items())
+        report = []
+        for (method, view), stats in items:
+            requests = stats['requests']
+            report.append({
+                'method': method,
+                'view': view,
+                'requests': requests,
+                'avg_queries': round(stats['queries'] / requests, 1),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['db_time'] / requests * 1000, 2),
+                'avg_serializer_ms': round(
+                    stats['serializer_time'] / requests * 1000, 2),
+                'avg_wall_ms': round(stats['wall_time'] / requests * 1000, 2),
+                'duplicate_queries': [
+                    {'sql': sql, 'count': count}
+                    for sql, count in stats['duplicates'].most_common(top)],
+            })
+        return sorted(report, key=lambda row: row['avg_queries'], reverse=True)
+
+
+profile_store = ProfileStore()
+
+# Новые соединения с БД по alias: при постоянных соединениях и пуле
+# счётчик почти не растёт между запросами.
+connects = Counter()
+
+
+def count_connection(sender, connection, **kwargs):
+    connects[connection.alias] += 1
+
+
+def connection_report():
+    """Настройки, число новых соединений и статистика пула по alias."""
+    report = {}
+    for connection in connections.all():
+        settings_dict = connection.settings_dict
+        row = {
+            'vendor': connection.vendor,
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': bool(settings_dict.get('CONN_HEALTH_CHECKS')),
+            'statement_timeout_ms': settings_dict.get('STATEMENT_TIMEOUT'),
+            'connects': connects[connection.alias],
+        }
+        pool_stats = getattr(connection, 'pool_stats', None)
+        if pool_stats is not None:
+            row.update(pool_stats())
+        report[connection.alias] = row
+    return report
+
+
+def install_serializer_timer():
+    """Считает время BaseSerializer.data внешнего сериализатора."""
+    original = BaseSerializer.data
+
+    def data(self):
+        profile = _current_profile.get()
+        if profile is None or profile.serializer_depth:
+            return original.fget(self)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            profile.serializer_depth -= 1
+            profile.serializer_time += time.perf_counter() - started
+
+    BaseSerializer.data = property(data)
+
+
+@contextmanager
+def profile_queries(profile=None):
+    """Подключает профиль запроса к соединениям текущего потока.
+
+    У каждого потока свои соединения, поэтому view, которое выполняется
+    в другом потоке (пул чтения под ASGI), подключает к своим
+    соединениям профиль из контекста запроса.
+    """
+    profile = profile or _current_profile.get()
+    with ExitStack() as stack:
+        if profile is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+class QueryProfilingMiddleware:
+    """Считает SQL-запросы, время БД, сериализации и ответа по view.
+
+    Включается через API_PROFILING['ENABLED']. Для потоковых ответов
+    учитываются только запросы, выполненные до возврата ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = settings.API_PROFILING
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with profile_queries(profile):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        wall_time = time.perf_counter() - started
+        record = {
+            'method': request.method,
+            'view': get_view_name(request),
+            'queries': profile.query_count,
+            'db_time': profile.db_time,
+            'serializer_time': profile.serializer_time,
+            'wall_time': wall_time,
+            'duplicates': profile.duplicates,
+        }
+        profile_store.add(record)
+        self.write_log(record)
+        response['Server-Timing'] = (
+            f'db;dur={profile.db_time * 1000:.1f}, '
+            f'serializer;dur={profile.serializer_time * 1000:.1f}, '
+            f'total;dur={wall_time * 1000:.1f}')
+        response['X-Query-Count'] = profile.query_count
+        self.check_budget(record)
+        return response
+
+    def write_log(self, record):
+        log_file = self.options['LOG_FILE']
+        if not log_file:
+            return
+        with open(log_file, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def check_budget(self, record):
+        budget = self.options['QUERY_BUDGETS'].get(record['view'])
+        if budget is None or record['queries'] <= budget:
+            return
+        message = (
+            f'{record["method"]} {record["view"]}: {record["queries"]} '
+            f'SQL-запросов при бюджете {budget}')
+        if self.options['RAISE_ON_BUDGET']:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
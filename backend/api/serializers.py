@@ -1,20 +1,56 @@
+from functools import partial
+
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes.cart import update_recipe_in_carts
+from recipes.counters import update_counter
+from recipes.feed import fan_out_recipe
+from recipes.images import delete_image, schedule_recipe_image
 from recipes.models import (
-    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag)
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCartItem,
+    ShoppingList, Tag)
+from recipes.relations import get_relations
+from recipes.search import update_search_vectors
 from users.models import User
 from users.serializers import CustomUserSerializer
 
 
+def get_recipes_limit(request):
+    """Значение ?recipes_limit= или None, если параметр не передан."""
+    limit = request.query_params.get('recipes_limit')
+    if limit is None:
+        return None
+    if not limit.isdigit():
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Введите целое неотрицательное число.'})
+    return int(limit)
+
+
 class RecipeBaseSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    image_rendition = 'thumbnail'
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def build_url(self, path):
+        url = default_storage.url(path)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        rendition = self.context.get('image_rendition', self.image_rendition)
+        path = instance.image_renditions.get(rendition, {}).get('jpeg')
+        if path:
+            data['image'] = self.build_url(path)
+        return data
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -49,6 +85,18 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount', 'measurement_unit', 'name',)
 
 
+class ShoppingCartItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit')
+    amount = serializers.IntegerField(source='total_amount')
+
+    class Meta:
+        model = ShoppingCartItem
+        fields = ('id', 'amount', 'measurement_unit', 'name')
+
+
 class RecipeWriteSerializer(RecipeBaseSerializer):
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientWriteSerializer(
@@ -63,36 +111,78 @@ class RecipeWriteSerializer(RecipeBaseSerializer):
         model = Recipe
         fields = '__all__'
 
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = [ingredient['id'].id for ingredient in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться.')
+        return ingredients
+
+    @staticmethod
+    def set_ingredients(recipe, ingredients):
+        """Вставляет, обновляет и удаляет только изменившиеся строки."""
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients}
+        current = {
+            item.ingredient_id: item
+            for item in RecipeIngredient.objects.filter(recipe=recipe)}
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current)
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('recipeingredient')
         recipe = Recipe.objects.create(author=author, **validated_data)
+        fan_out_recipe(recipe)
+        schedule_recipe_image(recipe.id)
+        update_counter(
+            User.objects.filter(id=author.id), 'recipes_count', 1)
         recipe.tags.set(tags)
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient.get('id'),
                 amount=ingredient.get('amount'))
+            for ingredient in ingredients)
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags', [])
-        ingredients = validated_data.pop('recipeingredient', [])
-        instance.name = validated_data.get('name', instance.name)
-        instance.image = validated_data.get('image', instance.image)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
-                recipe=instance,
-                ingredient=ingredient.get('id'),
-                amount=ingredient.get('amount'))
-        instance.save()
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('recipeingredient', None)
+        if 'image' in validated_data:
+            delete_image(instance.image.name, instance.image_renditions)
+            validated_data['image_renditions'] = {}
+            schedule_recipe_image(instance.id)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # updated_at меняется и когда правятся только теги или ингредиенты.
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            update_recipe_in_carts(instance, partial(
+                self.set_ingredients, instance, ingredients))
+        update_search_vectors(Recipe.objects.filter(pk=instance.pk))
         return instance
 
     def to_representation(self, instance):
@@ -107,10 +197,19 @@ class RecipeReadSerializer(RecipeBaseSerializer):
     tags = TagSerializer(many=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    images = serializers.SerializerMethodField(read_only=True)
+    image_rendition = 'card'
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('image_renditions', 'search_vector')
+
+    def get_images(self, obj):
+        return {
+            rendition: {
+                image_format: self.build_url(path)
+                for image_format, path in formats.items()}
+            for rendition, formats in obj.image_renditions.items()}
 
     def get_ingredients(self, obj):
         ingredients = obj.recipeingredient.all()
@@ -118,15 +217,15 @@ class RecipeReadSerializer(RecipeBaseSerializer):
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
-        if not request or request.user.is_anonymous:
+        if not request:
             return False
-        return obj.in_favorites.filter(user=request.user).exists()
+        return get_relations(request).has('favorites', obj.id)
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
-        if not request or request.user.is_anonymous:
+        if not request:
             return False
-        return obj.in_shoppinglists.filter(user=request.user).exists()
+        return get_relations(request).has('cart', obj.id)
 
 
 class ShoppingListSerializer(serializers.ModelSerializer):
@@ -146,6 +245,28 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    """Списки id рецептов для добавления и удаления одним запросом."""
+
+    MAX_RECIPES = 100
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        default=list, max_length=MAX_RECIPES)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        default=list, max_length=MAX_RECIPES)
+
+    def validate(self, data):
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError(
+                'Передайте id рецептов в add или remove.')
+        if set(data['add']) & set(data['remove']):
+            raise serializers.ValidationError(
+                'Рецепт не может быть одновременно в add и remove.')
+        return data
+
+
 class FollowSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
@@ -157,10 +278,12 @@ class FollowSerializer(CustomUserSerializer):
         read_only_fields = ('__all__',)
 
     def get_recipes(self, obj):
-        limit = int(
-            self.context.get('request').query_params.get('recipes_limit'))
-        recipes = Recipe.objects.filter(author=obj)[:limit]
+        if hasattr(obj, 'recipe_previews'):
+            recipes = obj.recipe_previews
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = Recipe.objects.filter(author=obj)[:limit]
         return RecipeBaseSerializer(recipes, many=True).data
 
     def get_recipes_count(self, data):
-        return data.recipes.count()
+        return data.recipes_count
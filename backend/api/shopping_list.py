@@ -0,0 +1,42 @@
+import csv
+
+from django.conf import settings
+from fpdf import FPDF, set_global
+
+from recipes.streaming import Echo
+
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+PDF_TITLE = 'Список покупок'
+
+set_global('FPDF_CACHE_MODE', 1)
+
+
+def render_txt(ingredients):
+    for name, measurement_unit, amount in ingredients:
+        yield f'{name} - {amount} {measurement_unit}\n'
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for name, measurement_unit, amount in ingredients:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def render_pdf(ingredients):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font('ShopList', '', settings.SHOPPING_LIST_PDF_FONT, uni=True)
+    pdf.set_font('ShopList', '', 16)
+    pdf.cell(0, 10, PDF_TITLE, ln=1, align='C')
+    pdf.set_font('ShopList', '', 12)
+    for name, measurement_unit, amount in ingredients:
+        pdf.cell(0, 8, f'{name} - {amount} {measurement_unit}', ln=1)
+    return pdf.output(dest='S').encode('latin1')
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'pdf': ('application/pdf', render_pdf),
+}
@@ -0,0 +1,41 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.cache import bump_version, touch
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import update_search_vectors
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, 'tag'))
+    touch('recipe_metadata')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredient_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, 'ingredient'))
+    touch('recipe_metadata')
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search(sender, instance, created, **kwargs):
+    # Название ингредиента входит в поисковый вектор рецептов.
+    if not created:
+        update_search_vectors(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver((post_save, post_delete), sender=User)
+def touch_user_profiles(sender, update_fields=None, **kwargs):
+    # Вход пользователя меняет только last_login, которого нет в ответах.
+    if update_fields != frozenset(('last_login',)):
+        touch('recipe_metadata')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def touch_recipes(sender, **kwargs):
+    touch('recipes')
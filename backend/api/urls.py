@@ -2,9 +2,11 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    FavoriteAPIView, FollowCreateDestroyAPIView, FollowViewSet,
-    IngredientViewSet, LoadShopListAPIView, RecipeViewSet,
-    ShoppingListAPIView, TagViewSet)
+    ConnectionReportAPIView, FavoriteAPIView, FavoriteBatchAPIView,
+    FollowCreateDestroyAPIView, FollowViewSet, IngredientViewSet,
+    LoadShopListAPIView, ProfilingReportAPIView, RecipeViewSet,
+    ShoppingCartSummaryAPIView, ShoppingListAPIView, ShoppingListBatchAPIView,
+    TagViewSet)
 
 app_name = 'api'
 
@@ -21,6 +23,11 @@ urlpatterns = [
          FavoriteAPIView.as_view()),
     path('recipes/<int:recipe_id>/shopping_cart/',
          ShoppingListAPIView.as_view()),
+    path('recipes/favorite/batch/', FavoriteBatchAPIView.as_view()),
+    path('recipes/shopping_cart/batch/', ShoppingListBatchAPIView.as_view()),
+    path('recipes/shopping_cart/', ShoppingCartSummaryAPIView.as_view()),
     path('recipes/download_shopping_cart/', LoadShopListAPIView.as_view()),
+    path('profiling/', ProfilingReportAPIView.as_view()),
+    path('profiling/connections/', ConnectionReportAPIView.as_view()),
     path('', include(router.urls)),
 ]
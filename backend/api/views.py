@@ -1,11 +1,13 @@
 import logging
 
-from django.core.files.base import ContentFile
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, status, viewsets
+from rest_framework import (
+    filters, generics, permissions, status, viewsets)
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -13,14 +15,29 @@ from rest_framework.viewsets import ModelViewSet
 
 from api.serializers import (
     FavoriteSerializer, FollowSerializer, IngredientSerializer,
-    RecipeBaseSerializer, RecipeIngredientReadSerializer, RecipeReadSerializer,
-    RecipeWriteSerializer, ShoppingListSerializer, TagSerializer)
+    RecipeBaseSerializer, RecipeBatchSerializer,
+    RecipeIngredientReadSerializer, RecipeReadSerializer,
+    RecipeWriteSerializer, ShoppingCartItemSerializer, ShoppingListSerializer,
+    TagSerializer, get_recipes_limit)
+from recipes.cache import get_modified
+from recipes.cart import get_shopping_list
 from recipes.models import (
-    Favorite, Follow, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag)
+    Ingredient, Recipe, RecipeIngredient, ShoppingCartItem, Tag)
+from recipes.relations import (
+    add_relations, delete_recipe, remove_relations)
 from users.models import User
 from users.permissions import IsAuthorOrReadOnly
 from users.serializers import CustomUserSerializer
+from .autocomplete import autocomplete
+from .cache import CachedListMixin
+from .conditional import (
+    conditional_response, get_validators, set_validators)
 from .filters import IngredientSearchFilter, RecipeFilter
+from .pagination import (
+    CursorPaginationMixin, FeedPagination, RecipeCursorPagination,
+    SubscriptionCursorPagination)
+from .profiling import connection_report, profile_store
+from .shopping_list import SHOPPING_LIST_FORMATS
 
 
 logging.basicConfig(level=logging.INFO)
@@ -49,7 +66,8 @@ class UsersViewSet(ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(CachedListMixin, ModelViewSet):
+    cache_version_name = 'ingredient'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthorOrReadOnly,)
@@ -57,83 +75,204 @@ class IngredientViewSet(ModelViewSet):
     search_fields = ('^name',)
     pagination_class = None
 
+    @action(methods=('get',), detail=False)
+    def autocomplete(self, request):
+        return Response(autocomplete(request.query_params.get('name', '')))
 
-class TagViewSet(ModelViewSet):
+
+class TagViewSet(CachedListMixin, ModelViewSet):
+    cache_version_name = 'tag'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthorOrReadOnly,)
     pagination_class = None
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(CursorPaginationMixin, ModelViewSet):
     queryset = Recipe.objects.all()
+    cursor_pagination_class = RecipeCursorPagination
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('created_at', 'favorites_count', 'cart_count')
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        if self.action not in ('list', 'retrieve', 'feed'):
+            return super().get_queryset()
+        return Recipe.objects.defer('search_vector').select_related(
+            'author').prefetch_related(
+            Prefetch(
+                'recipeingredient',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')),
+            'tags')
+
+    def perform_destroy(self, instance):
+        delete_recipe.delay(instance.id)
+
+    def list(self, request, *args, **kwargs):
+        """Список с ETag по id и updated_at рецептов страницы.
+
+        Страница сначала выбирается лёгким запросом; если у клиента она
+        актуальна, сериализаторы не запускаются, иначе рецепты страницы
+        загружаются одним in_bulk.
+        """
+        queryset = self.filter_queryset(
+            Recipe.objects.only('id', 'created_at', 'updated_at'))
+        page = self.paginate_queryset(queryset)
+        recipes = list(queryset) if page is None else page
+        content = [(recipe.id, recipe.updated_at) for recipe in recipes]
+        if page is not None:
+            content.append(self.get_paginated_response([]).data)
+        etag, last_modified = get_validators(
+            request, get_modified('recipes'), content)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        loaded = self.get_queryset().in_bulk(
+            [recipe.id for recipe in recipes])
+        data = self.get_serializer(
+            [loaded[recipe.id] for recipe in recipes
+             if recipe.id in loaded], many=True).data
+        if page is None:
+            response = Response(data)
+        else:
+            response = self.get_paginated_response(data)
+        return set_validators(request, response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            updated_at = Recipe.objects.filter(
+                pk=kwargs[self.lookup_field]).values_list(
+                    'updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = get_validators(
+            request, updated_at.timestamp(), updated_at)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(
+            request, super().retrieve(request, *args, **kwargs), etag,
+            last_modified)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'retrieve':
+            context['image_rendition'] = 'detail'
+        return context
+
+    @action(detail=False, permission_classes=(permissions.IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми."""
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_feed(request, request.user.id)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def toggle_relation(view_class, request, pk):
+        handler = getattr(view_class(), request.method.lower())
+        return handler(request, int(pk))
+
     @action(methods=['post', 'delete'], detail=True,
             permission_classes=[permissions.IsAuthenticated])
     def favorite(self, request, pk):
-        if request.method == 'POST':
-            return AbstractAPIView().post(
-                request, pk, Favorite, FavoriteSerializer)
-        elif request.method == 'DELETE':
-            return AbstractAPIView().delete(
-                request, pk, Favorite)
+        return self.toggle_relation(FavoriteAPIView, request, pk)
 
     @action(methods=['post', 'delete'], detail=True,
             permission_classes=[permissions.IsAuthenticated])
     def shopping_list(self, request, pk):
-        if request.method == 'POST':
-            return AbstractAPIView().post(
-                request, pk, ShoppingList, ShoppingListSerializer)
-        elif request.method == 'DELETE':
-            return AbstractAPIView().delete(
-                request, pk, ShoppingList)
+        return self.toggle_relation(ShoppingListAPIView, request, pk)
 
 
 class AbstractAPIView(APIView):
-    model = None
     serializer_class = None
+    relation = None
 
     def post(self, request, recipe_id):
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        if (not self.model.objects.filter(
-                user=request.user, recipe=recipe).exists()):
-            self.model.objects.create(user=request.user, recipe=recipe)
-            serializer = RecipeBaseSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        if not add_relations(request.user.id, self.relation, [recipe_id]):
+            get_object_or_404(Recipe, id=recipe_id)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        serializer = RecipeBaseSerializer(Recipe.objects.get(id=recipe_id))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, recipe_id):
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        list_item = get_object_or_404(
-            self.model, user=request.user, recipe=recipe)
-        list_item.delete()
+        if not remove_relations(request.user.id, self.relation, [recipe_id]):
+            raise NotFound
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class FavoriteAPIView(AbstractAPIView):
-    model = Favorite
     serializer_class = FavoriteSerializer
+    relation = 'favorites'
 
 
 class ShoppingListAPIView(AbstractAPIView):
-    model = ShoppingList
     serializer_class = ShoppingListSerializer
+    relation = 'cart'
+
+
+class AbstractBatchAPIView(APIView):
+    """Добавляет и удаляет несколько рецептов одной транзакцией.
+
+    Отвечает id рецептов, которые действительно изменили состояние:
+    несуществующие, уже добавленные и уже удалённые пропускаются.
+    """
 
+    serializer_class = RecipeBatchSerializer
+    relation = None
 
-class FollowViewSet(viewsets.ReadOnlyModelViewSet):
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            added = add_relations(
+                request.user.id, self.relation,
+                serializer.validated_data['add'])
+            removed = remove_relations(
+                request.user.id, self.relation,
+                serializer.validated_data['remove'])
+        return Response({'added': added, 'removed': removed})
+
+
+class FavoriteBatchAPIView(AbstractBatchAPIView):
+    relation = 'favorites'
+
+
+class ShoppingListBatchAPIView(AbstractBatchAPIView):
+    relation = 'cart'
+
+
+class FollowViewSet(CursorPaginationMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = FollowSerializer
+    cursor_pagination_class = SubscriptionCursorPagination
     permission_classes = (permissions.IsAuthenticated, )
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        recipes = Recipe.objects.order_by('-created_at', '-id')
+        limit = get_recipes_limit(self.request)
+        if limit is not None:
+            # Первые limit рецептов каждого автора одним запросом
+            # для всей страницы подписок.
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(author=OuterRef('author')).order_by(
+                    '-created_at', '-id').values('pk')[:limit]))
+        return User.objects.filter(
+            following__user=self.request.user).annotate(
+                is_subscribed=Value(True)).prefetch_related(
+                    Prefetch('recipes', queryset=recipes,
+                             to_attr='recipe_previews')).order_by('-id')
 
 
 class FollowCreateDestroyAPIView(APIView):
@@ -141,36 +280,78 @@ class FollowCreateDestroyAPIView(APIView):
     permission_classes = (permissions.IsAuthenticated, )
 
     def post(self, request, *args, **kwargs):
-        author = get_object_or_404(User, id=self.kwargs.get('user_id'))
-        user = request.user
-        if not Follow.objects.filter(user=user, author=author).exists():
-            Follow.objects.create(user=user, author=author)
-            return Response(self.serializer_class(
-                author, context={'request': request}).data,
-                status=status.HTTP_201_CREATED)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        author_id = self.kwargs.get('user_id')
+        if author_id == request.user.id:
+            return Response(
+                {'errors': 'Нельзя подписаться на себя'},
+                status=status.HTTP_400_BAD_REQUEST)
+        if not add_relations(request.user.id, 'following', [author_id]):
+            get_object_or_404(User, id=author_id)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.serializer_class(
+            User.objects.get(id=author_id), context={'request': request}).data,
+            status=status.HTTP_201_CREATED)
 
     def delete(self, request, *args, **kwargs):
-        author = get_object_or_404(User, id=self.kwargs.get('user_id'))
-        follow = get_object_or_404(Follow, user=request.user, author=author)
-        follow.delete()
+        if not remove_relations(
+                request.user.id, 'following', [self.kwargs.get('user_id')]):
+            raise NotFound
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ShoppingCartSummaryAPIView(generics.ListAPIView):
+    """Ингредиенты списка покупок с суммарным количеством."""
+
+    serializer_class = ShoppingCartItemSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = None
+
+    def get_queryset(self):
+        return ShoppingCartItem.objects.filter(
+            user=self.request.user).select_related('ingredient').order_by(
+                'ingredient__name')
+
+
 class LoadShopListAPIView(APIView):
     serializer_class = RecipeIngredientReadSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= выбирает формат файла, а не рендерер DRF.
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in_shoppinglists__user=request.user).values_list(
-                'ingredient__name', 'ingredient__measurement_unit').annotate(
-                    total_amount=Sum('amount'))
-        shop_list = '\n'.join([
-            f'{ingredient[0]} - {ingredient[2]} {ingredient[1]}'
-            for ingredient in ingredients])
-        filename = 'shop_list.txt'
-        content_file = ContentFile(shop_list)
-        response = HttpResponse(content_file, content_type='text/plain')
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {'format': f'Допустимые форматы: '
+                           f'{", ".join(SHOPPING_LIST_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        content_type, render = SHOPPING_LIST_FORMATS[file_format]
+        content = render(get_shopping_list(request.user).iterator())
+        if isinstance(content, bytes):
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                content, content_type=content_type)
+        filename = f'shop_list.{file_format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+
+class ProfilingReportAPIView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(profile_store.report())
+
+    def delete(self, request):
+        profile_store.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ConnectionReportAPIView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(connection_report())
@@ -0,0 +1,21 @@
+"""
+ASGI config for foodgram_backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read requests are served from a bounded thread pool, see
+``api.handlers.ReadPoolASGIHandler``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup(set_prefix=False)
+
+from api.handlers import ReadPoolASGIHandler  # noqa: E402
+
+application = ReadPoolASGIHandler()
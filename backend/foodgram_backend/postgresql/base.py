@@ -0,0 +1,154 @@
+import threading
+from collections import Counter
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2.extras import register_default_jsonb
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+# Счётчики процесса: проверки соединений, ожидания и отказы пула.
+stats = Counter()
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool, который ждёт свободное соединение.
+
+    psycopg2 сразу бросает PoolError, когда выданы все max_size
+    соединений; здесь поток ждёт до timeout секунд. Простаивать в пуле
+    остаются не больше min_size соединений, остальные закрываются.
+    """
+
+    def __init__(self, min_size, max_size, timeout, **conn_params):
+        super().__init__(min_size, max_size, **conn_params)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(blocking=False):
+            stats['pool_waits'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                stats['pool_timeouts'] += 1
+                raise PoolError(
+                    f'Нет свободного соединения за {self.timeout} с')
+        try:
+            connection = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return connection
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def get_stats(self):
+        return {
+            'min_size': self.minconn,
+            'max_size': self.maxconn,
+            'in_use': self.in_use,
+        }
+
+
+def get_pool(options, conn_params):
+    key = tuple(sorted((name, str(value))
+                       for name, value in conn_params.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = BlockingConnectionPool(
+                options.get('min_size', 1), options.get('max_size', 10),
+                options.get('timeout', 10), **conn_params)
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой соединений, пулом и statement_timeout.
+
+    CONN_HEALTH_CHECKS и OPTIONS['pool'] повторяют настройки Django
+    4.1 и 5.1: постоянное соединение проверяется SELECT 1 один раз
+    за запрос перед первым использованием, пул psycopg2 включается
+    ключами min_size, max_size и timeout. STATEMENT_TIMEOUT в мс
+    задаётся каждому новому соединению.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(options, conn_params)
+        connection = self.pool.getconn()
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        timeout = self.settings_dict.get('STATEMENT_TIMEOUT')
+        if timeout:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SET statement_timeout = %s', [int(timeout)])
+            if not self.get_autocommit():
+                self.connection.commit()
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            pool.putconn(
+                self.connection,
+                close=self.errors_occurred or bool(self.connection.closed))
+
+    def close_if_unusable_or_obsolete(self):
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+                or self.health_check_done or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            stats['health_check_failures'] += 1
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def pool_stats(self):
+        return {
+            'health_check_failures': stats['health_check_failures'],
+            'pool_waits': stats['pool_waits'],
+            'pool_timeouts': stats['pool_timeouts'],
+            'pools': [pool.get_stats() for pool in list(_pools.values())],
+        }
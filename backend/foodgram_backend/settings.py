@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from import_export.formats.base_formats import CSV, XLS, JSON, YAML, HTML
 
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
@@ -43,6 +45,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_PROFILING = {
+    'ENABLED': os.getenv('API_PROFILING', 'False').lower() == 'true',
+    'LOG_FILE': os.getenv('API_PROFILING_LOG_FILE', ''),
+    'QUERY_BUDGETS': {},
+    'RAISE_ON_BUDGET': False,
+}
+
+if API_PROFILING['ENABLED']:
+    MIDDLEWARE.insert(0, 'api.profiling.QueryProfilingMiddleware')
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -63,18 +75,72 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+# foodgram_backend.postgresql - обычный бэкенд PostgreSQL с проверкой
+# соединений, пулом и statement_timeout; стандартный заменяется им.
+DB_ENGINE = os.getenv('DB_ENGINE', 'foodgram_backend.postgresql')
+if DB_ENGINE == 'django.db.backends.postgresql':
+    DB_ENGINE = 'foodgram_backend.postgresql'
+CUSTOM_DB_ENGINE = DB_ENGINE == 'foodgram_backend.postgresql'
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv(
-            'DB_ENGINE', 'django.db.backends.postgresql'),
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('DB_NAME', 'foodgram'),
         'USER': os.getenv('POSTGRES_USER', 'foodgram'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram'),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Соединение живёт DB_CONN_MAX_AGE секунд и перед первым запросом
+        # в каждом HTTP-запросе проверяется SELECT 1. Проверку умеет
+        # только foodgram_backend.postgresql, с другими бэкендами
+        # соединение по умолчанию не переиспользуется.
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE', 60 if CUSTOM_DB_ENGINE else 0)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'STATEMENT_TIMEOUT': int(os.getenv('DB_STATEMENT_TIMEOUT', 0)),
+        # pgbouncer в режиме transaction не поддерживает серверные курсоры.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_PGBOUNCER', 'False').lower() == 'true',
+        'OPTIONS': {},
     }
 }
 
+if not CUSTOM_DB_ENGINE and (
+        int(os.getenv('DB_POOL_MAX_SIZE', 0))
+        or DATABASES['default']['STATEMENT_TIMEOUT']):
+    raise ImproperlyConfigured(
+        'DB_POOL_MAX_SIZE и DB_STATEMENT_TIMEOUT работают только с '
+        'DB_ENGINE=foodgram_backend.postgresql')
+
+if int(os.getenv('DB_POOL_MAX_SIZE', 0)):
+    # С пулом соединение возвращается в пул после каждого запроса.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    }
+
+# Версии кэшированных списков, кэш связей и время изменений должны быть
+# общими для веб-процессов, воркеров и manage.py: в docker-compose это
+# memcached. LocMemCache годится только для тестов и одного процесса,
+# manage.py check --deploy сообщает о нём как об ошибке.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+API_RESPONSE_CACHE = 'default'
+API_RESPONSE_CACHE_TIMEOUT = int(os.getenv('API_RESPONSE_CACHE_TIMEOUT', 3600))
+RELATIONS_CACHE_TIMEOUT = int(os.getenv('RELATIONS_CACHE_TIMEOUT', 300))
+# Сколько секунд nginx и браузер могут отдавать рецепты анонимам без
+# запроса к бэкенду.
+ANONYMOUS_CACHE_MAX_AGE = int(os.getenv('ANONYMOUS_CACHE_MAX_AGE', 60))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,8 +176,49 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / '/media/'
 
+# Выгрузки из админки содержат персональные данные: каталог вне кода и
+# вне MEDIA_ROOT, nginx его не раздаёт.
+EXPORTS_ROOT = os.getenv('EXPORTS_ROOT', '/var/lib/foodgram/exports/')
+
 EMPTY_VALUE_DISPLAY = '-пусто-'
 
+IMAGE_PIPELINE = {
+    'MAX_SIZE': 2048,
+    'QUALITY': 85,
+}
+
+# Фоновые задачи (tasks.queue): immediate - сразу после коммита в том же
+# потоке, local - в пуле из WORKERS потоков процесса, database - через
+# таблицу очереди и воркер manage.py run_tasks. Упавшая задача
+# повторяется до MAX_ATTEMPTS раз с паузой RETRY_DELAY * 2^(n - 1) с.
+TASKS = {
+    'BACKEND': os.getenv('TASKS_BACKEND', 'local'),
+    'WORKERS': int(os.getenv('TASKS_WORKERS', 2)),
+    'MAX_ATTEMPTS': int(os.getenv('TASKS_MAX_ATTEMPTS', 3)),
+    'RETRY_DELAY': 5,
+    'POLL_INTERVAL': 1,
+    'TIMEOUT': 600,
+}
+
+# Потоки для GET-запросов под ASGI (foodgram_backend.asgi). Каждый
+# поток держит своё соединение с БД.
+ASGI_READ_POOL = {
+    'THREADS': int(os.getenv('ASGI_READ_THREADS', 8)),
+}
+
+# Рецепты авторов, у которых подписчиков не больше FANOUT_MAX_FOLLOWERS,
+# записываются в ленты подписчиков при публикации, остальные
+# подмешиваются при чтении. BACKFILL - сколько последних рецептов автора
+# добавить в ленту при подписке.
+FEED = {
+    'FANOUT_MAX_FOLLOWERS': int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000)),
+    'BACKFILL': 100,
+}
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -124,6 +231,11 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
 }
 
+INGREDIENT_AUTOCOMPLETE = {
+    'LIMIT': int(os.getenv('INGREDIENT_AUTOCOMPLETE_LIMIT', 10)),
+    'MEMORY_PREFIX_LENGTH': 3,
+}
+
 DJOSER = {
     'HIDE_USERS': False,
     'PERMISSIONS': {
@@ -134,6 +246,16 @@ DJOSER = {
         'current_user': 'users.serializers.CustomUserSerializer',
         'user': 'users.serializers.CustomUserSerializer',
     },
+    'EMAIL': {
+        'activation': 'users.emails.ActivationEmail',
+        'confirmation': 'users.emails.ConfirmationEmail',
+        'password_reset': 'users.emails.PasswordResetEmail',
+        'password_changed_confirmation':
+            'users.emails.PasswordChangedConfirmationEmail',
+        'username_changed_confirmation':
+            'users.emails.UsernameChangedConfirmationEmail',
+        'username_reset': 'users.emails.UsernameResetEmail',
+    },
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,166 @@
+import csv
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import connection, transaction
+
+from recipes.cache import touch
+from recipes.counters import update_counter
+from recipes.feed import fan_out_recipes
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag)
+from recipes.search import update_search_vectors
+from users.models import User
+
+# Колонки выгрузки рецептов; tags и ingredients - списки, в CSV они
+# записываются как JSON.
+RECIPE_FIELDS = (
+    'id', 'name', 'author__email', 'text', 'cooking_time', 'image',
+    'created_at')
+RECIPE_RELATED_FIELDS = ('tags', 'ingredients')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def add_recipe_relations(rows):
+    """Добавляет к строкам рецептов теги и ингредиенты двумя запросами."""
+    ids = [row['id'] for row in rows]
+    tags = defaultdict(list)
+    for recipe_id, slug in RecipeTag.objects.filter(
+            recipe_id__in=ids).values_list('recipe_id', 'tag__slug'):
+        tags[recipe_id].append(slug)
+    ingredients = defaultdict(list)
+    for recipe_id, name, measurement_unit, amount in (
+            RecipeIngredient.objects.filter(recipe_id__in=ids).values_list(
+                'recipe_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount')):
+        ingredients[recipe_id].append({
+            'name': name, 'measurement_unit': measurement_unit,
+            'amount': amount})
+    for row in rows:
+        row['tags'] = tags[row['id']]
+        row['ingredients'] = ingredients[row['id']]
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        for field in RECIPE_RELATED_FIELDS:
+            row[field] = json.loads(row.get(field) or '[]')
+        yield row
+
+
+READERS = {'.jsonl': read_jsonl, '.csv': read_csv}
+
+
+def positive_int(value, field):
+    value = int(value)
+    if value < 1:
+        raise ValueError(f'{field} должно быть больше 0')
+    return value
+
+
+def build_recipe(row, authors, tags, ingredients):
+    """Рецепт и его связи из строки выгрузки; ошибки - ValueError."""
+    email = row.get('author__email')
+    if email not in authors:
+        raise ValueError(f'автор {email} не найден')
+    recipe = Recipe(
+        author_id=authors[email], name=row['name'], text=row['text'],
+        image=row['image'],
+        cooking_time=positive_int(row['cooking_time'], 'cooking_time'))
+    tag_ids = set()
+    for slug in row['tags']:
+        if slug not in tags:
+            raise ValueError(f'тег {slug} не найден')
+        tag_ids.add(tags[slug])
+    amounts = Counter()
+    for item in row['ingredients']:
+        key = (item['name'], item['measurement_unit'])
+        if key not in ingredients:
+            raise ValueError(f'ингредиент {key[0]} ({key[1]}) не найден')
+        amounts[ingredients[key]] += positive_int(item['amount'], 'amount')
+    if not tag_ids or not amounts:
+        raise ValueError('у рецепта нет тегов или ингредиентов')
+    return recipe, tag_ids, amounts
+
+
+def save_recipes(recipes):
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+    else:
+        for recipe in recipes:
+            recipe.save()
+
+
+@transaction.atomic
+def import_chunk(numbered_rows, tags, ingredients):
+    """Сохраняет порцию рецептов в одной транзакции.
+
+    Возвращает число созданных рецептов и ошибки строк, которые
+    пропущены.
+    """
+    authors = dict(User.objects.filter(email__in={
+        row.get('author__email') for _, row in numbered_rows}).values_list(
+            'email', 'id'))
+    built, errors = [], []
+    for number, row in numbered_rows:
+        try:
+            built.append(build_recipe(row, authors, tags, ingredients))
+        except (KeyError, TypeError, ValueError) as error:
+            errors.append(f'Строка {number}: {error}')
+    if not built:
+        return 0, errors
+    save_recipes([recipe for recipe, _, _ in built])
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag_id=tag_id)
+        for recipe, tag_ids, _ in built for tag_id in tag_ids)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+        for recipe, _, amounts in built
+        for ingredient_id, amount in amounts.items())
+    for author_id, count in Counter(
+            recipe.author_id for recipe, _, _ in built).items():
+        update_counter(
+            User.objects.filter(id=author_id), 'recipes_count', count)
+    recipe_ids = [recipe.id for recipe, _, _ in built]
+    update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+    fan_out_recipes(recipe_ids)
+    touch('recipes')
+    return len(built), errors
+
+
+def import_recipes(rows, chunk_size, progress=None, start=1):
+    """Импортирует рецепты порциями по chunk_size, каждую своим коммитом.
+
+    Упавшая порция откатывается целиком, уже записанные остаются.
+    progress(imported, skipped, errors) вызывается после каждой порции,
+    start - номер первой строки в сообщениях об ошибках.
+    """
+    tags = dict(Tag.objects.values_list('slug', 'id'))
+    ingredients = {
+        (name, measurement_unit): pk
+        for pk, name, measurement_unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit')}
+    imported = skipped = 0
+    for chunk in chunked(enumerate(rows, start=start), chunk_size):
+        created, errors = import_chunk(chunk, tags, ingredients)
+        imported += created
+        skipped += len(errors)
+        if progress is not None:
+            progress(imported, skipped, errors)
+    return imported, skipped
@@ -0,0 +1,55 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def get_cache():
+    return caches[settings.API_RESPONSE_CACHE]
+
+
+def version_key(name):
+    return f'api:version:{name}'
+
+
+def get_version(name):
+    """Версия данных name; общая для процессов только при общем кэше."""
+    cache = get_cache()
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), 1, timeout=None)
+        version = cache.get(version_key(name), 1)
+    return version
+
+
+def bump_version(name):
+    cache = get_cache()
+    try:
+        cache.incr(version_key(name))
+    except ValueError:
+        cache.set(version_key(name), 2, timeout=None)
+
+
+def modified_key(name):
+    return f'api:modified:{name}'
+
+
+def set_modified(name):
+    get_cache().set(modified_key(name), time.time(), timeout=None)
+
+
+def touch(name):
+    """Запоминает время изменения данных name после коммита."""
+    transaction.on_commit(partial(set_modified, name))
+
+
+def get_modified(name):
+    """Время последнего touch(name); при пустом кэше - текущее."""
+    cache = get_cache()
+    modified = cache.get(modified_key(name))
+    if modified is None:
+        cache.add(modified_key(name), time.time(), timeout=None)
+        modified = cache.get(modified_key(name), time.time())
+    return modified
@@ -0,0 +1,102 @@
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Greatest
+
+from recipes.models import RecipeIngredient, ShoppingCartItem, ShoppingList
+from users.models import User
+
+
+def get_shopping_list(user):
+    """Суммарное количество ингредиентов из корзины пользователя."""
+    return ShoppingCartItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit',
+        'total_amount').order_by('ingredient__name')
+
+
+def recipe_amounts(recipe_ids):
+    """Сумма каждого ингредиента по рецептам recipe_ids."""
+    return RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids).order_by().values(
+            'ingredient_id').annotate(total=Sum('amount'))
+
+
+def increase_cart_items(user_ids, recipe_ids):
+    """Добавляет ингредиенты рецептов в списки покупок пользователей.
+
+    Один INSERT ... ON CONFLICT DO UPDATE: недостающие строки
+    создаются, существующие увеличиваются на сумму рецептов, поэтому
+    параллельные добавления не теряют друг друга. user_ids - queryset
+    с одной колонкой id пользователей.
+    """
+    quote = connection.ops.quote_name
+    table = quote(ShoppingCartItem._meta.db_table)
+    amounts_sql, amounts_params = recipe_amounts(
+        recipe_ids).query.sql_with_params()
+    users_sql, users_params = user_ids.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} '
+            f'({quote("user_id")}, {quote("ingredient_id")}, '
+            f'{quote("total_amount")}) '
+            f'SELECT users.{quote("id")}, amounts.{quote("ingredient_id")}, '
+            f'amounts.{quote("total")} '
+            f'FROM {quote(User._meta.db_table)} users, '
+            f'({amounts_sql}) amounts '
+            f'WHERE users.{quote("id")} IN ({users_sql}) '
+            f'ON CONFLICT ({quote("user_id")}, {quote("ingredient_id")}) '
+            f'DO UPDATE SET {quote("total_amount")} = '
+            f'{table}.{quote("total_amount")} + '
+            f'EXCLUDED.{quote("total_amount")}',
+            (*amounts_params, *users_params))
+
+
+def decrease_cart_items(user_ids, recipe_ids):
+    """Вычитает ингредиенты рецептов и удаляет обнулившиеся строки."""
+    amount = Subquery(recipe_amounts(recipe_ids).filter(
+        ingredient_id=OuterRef('ingredient_id')).values('total'))
+    items = ShoppingCartItem.objects.filter(user_id__in=user_ids)
+    items.filter(ingredient_id__in=recipe_amounts(recipe_ids).values(
+        'ingredient_id')).update(
+            total_amount=Greatest(F('total_amount') - amount, 0))
+    items.filter(total_amount=0).delete()
+
+
+def update_recipe_in_carts(recipe, change_ingredients):
+    """Пересчитывает списки покупок, где лежит рецепт, при смене состава.
+
+    Вклад рецепта вычитается по старому составу и добавляется по новому.
+    Без рецепта в корзинах (cart_count == 0) запросов нет.
+    """
+    if not recipe.cart_count:
+        change_ingredients()
+        return
+    user_ids = ShoppingList.objects.filter(recipe=recipe).values('user_id')
+    decrease_cart_items(user_ids, [recipe.id])
+    change_ingredients()
+    increase_cart_items(user_ids, [recipe.id])
+
+
+def remove_recipe_from_carts(recipe):
+    """Вычитает рецепт из всех списков покупок перед его удалением."""
+    if recipe.cart_count:
+        decrease_cart_items(
+            ShoppingList.objects.filter(recipe=recipe).values('user_id'),
+            [recipe.id])
+
+
+@transaction.atomic
+def rebuild_cart_items():
+    """Заново заполняет таблицу из списков покупок и рецептов."""
+    ShoppingCartItem.objects.all().delete()
+    totals = ShoppingList.objects.filter(
+        recipe__recipeingredient__isnull=False).order_by().values(
+            'user_id', 'recipe__recipeingredient__ingredient_id').annotate(
+                total=Sum('recipe__recipeingredient__amount'))
+    sql, params = totals.query.sql_with_params()
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ShoppingCartItem._meta.db_table)} '
+            f'({quote("user_id")}, {quote("ingredient_id")}, '
+            f'{quote("total_amount")}) {sql}', params)
+        return cursor.rowcount
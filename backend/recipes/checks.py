@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии кэша должны доходить до всех процессов."""
+    backend = settings.CACHES[settings.API_RESPONSE_CACHE]['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'{backend} не общий для процессов: правки из manage.py и других '
+        f'воркеров не сбросят кэш списков, индекс ингредиентов и кэш '
+        f'связей.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша, '
+             'например memcached из infra/docker-compose.yml.',
+        id='recipes.E001')]
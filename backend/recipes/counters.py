@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from recipes.cache import touch
+from recipes.models import Favorite, Follow, Recipe, ShoppingList
+from users.models import User
+
+
+def update_counter(queryset, field, delta, **changes):
+    """Атомарно изменяет денормализованный счётчик на delta.
+
+    Счётчик не опускается ниже нуля, даже если разошёлся со строками.
+    """
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    return queryset.update(**{field: value}, **changes)
+
+
+def count_subquery(queryset, field):
+    """Количество строк queryset, связанных с внешней строкой по field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def recount():
+    """Пересчитывает все счётчики одним UPDATE на таблицу."""
+    recipes = Recipe.objects.update(
+        favorites_count=count_subquery(Favorite.objects, 'recipe'),
+        cart_count=count_subquery(ShoppingList.objects, 'recipe'),
+        updated_at=timezone.now())
+    touch('recipes')
+    users = User.objects.update(
+        recipes_count=count_subquery(Recipe.objects, 'author'),
+        followers_count=count_subquery(Follow.objects, 'author'))
+    return recipes, users
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Follow, Recipe
+from users.models import User
+
+
+def fanout_limit():
+    return settings.FEED['FANOUT_MAX_FOLLOWERS']
+
+
+def insert_entries(select_sql, params):
+    """INSERT строк (user_id, recipe_id, created_at) без дублей."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(FeedEntry._meta.db_table)} '
+            f'({quote("user_id")}, {quote("recipe_id")}, '
+            f'{quote("created_at")}) {select_sql} '
+            f'ON CONFLICT ({quote("user_id")}, {quote("recipe_id")}) '
+            f'DO NOTHING', params)
+        return cursor.rowcount
+
+
+def fan_out_recipe(recipe):
+    """Записывает новый рецепт в ленты подписчиков автора одним INSERT.
+
+    Рецепты авторов с большим числом подписчиков не раскладываются:
+    feed_page подмешивает их при чтении.
+    """
+    quote = connection.ops.quote_name
+    return insert_entries(
+        f'SELECT follow.{quote("user_id")}, %s, %s '
+        f'FROM {quote(Follow._meta.db_table)} follow '
+        f'INNER JOIN {quote(User._meta.db_table)} author '
+        f'ON author.{quote("id")} = follow.{quote("author_id")} '
+        f'WHERE follow.{quote("author_id")} = %s '
+        f'AND author.{quote("followers_count")} <= %s',
+        [recipe.id,
+         connection.ops.adapt_datetimefield_value(recipe.created_at),
+         recipe.author_id, fanout_limit()])
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    quote = connection.ops.quote_name
+    return insert_entries(
+        f'SELECT %s, recipe.{quote("id")}, recipe.{quote("created_at")} '
+        f'FROM {quote(Recipe._meta.db_table)} recipe '
+        f'INNER JOIN {quote(User._meta.db_table)} author '
+        f'ON author.{quote("id")} = recipe.{quote("author_id")} '
+        f'WHERE recipe.{quote("author_id")} = %s '
+        f'AND author.{quote("followers_count")} <= %s '
+        f'ORDER BY recipe.{quote("created_at")} DESC LIMIT %s',
+        [user_id, author_id, fanout_limit(), settings.FEED['BACKFILL']])
+
+
+def remove_authors_from_feed(user_id, author_ids):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids).delete()
+
+
+def before(position, field):
+    """Строки строго после курсора (created_at, id) в порядке убывания."""
+    created_at, object_id = position
+    return Q(created_at__lt=created_at) | Q(
+        created_at=created_at, **{f'{field}__lt': object_id})
+
+
+def feed_page(user_id, position, limit):
+    """Не больше limit пар (created_at, id рецепта) ленты после position.
+
+    Лента пользователя и рецепты популярных авторов читаются двумя
+    запросами по индексам (user, -created_at) и (author, -created_at),
+    каждый не больше limit строк, и сливаются по убыванию даты.
+    """
+    merged_authors = list(Follow.objects.filter(
+        user_id=user_id,
+        author__followers_count__gt=fanout_limit()).values_list(
+            'author_id', flat=True))
+    sources = [(FeedEntry.objects.filter(user_id=user_id), 'recipe_id')]
+    if merged_authors:
+        sources.append(
+            (Recipe.objects.filter(author_id__in=merged_authors), 'id'))
+    rows = set()
+    for queryset, field in sources:
+        if position is not None:
+            queryset = queryset.filter(before(position, field))
+        rows.update(queryset.order_by(
+            '-created_at', f'-{field}').values_list(
+                'created_at', field)[:limit])
+    return sorted(rows, reverse=True)[:limit]
+
+
+def fan_out_recipes(recipe_ids=None):
+    """Раскладывает рецепты по лентам подписчиков одним INSERT.
+
+    Без recipe_ids раскладываются все рецепты.
+    """
+    quote = connection.ops.quote_name
+    sql = (
+        f'SELECT follow.{quote("user_id")}, recipe.{quote("id")}, '
+        f'recipe.{quote("created_at")} '
+        f'FROM {quote(Follow._meta.db_table)} follow '
+        f'INNER JOIN {quote(Recipe._meta.db_table)} recipe '
+        f'ON recipe.{quote("author_id")} = follow.{quote("author_id")} '
+        f'INNER JOIN {quote(User._meta.db_table)} author '
+        f'ON author.{quote("id")} = follow.{quote("author_id")} '
+        f'WHERE author.{quote("followers_count")} <= %s')
+    params = [fanout_limit()]
+    if recipe_ids is not None:
+        if not recipe_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        sql += f' AND recipe.{quote("id")} IN ({placeholders})'
+        params.extend(recipe_ids)
+    return insert_entries(sql, params)
+
+
+@transaction.atomic
+def rebuild_feeds():
+    """Заново раскладывает рецепты авторов по лентам подписчиков."""
+    FeedEntry.objects.all().delete()
+    return fan_out_recipes()
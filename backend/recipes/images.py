@@ -0,0 +1,108 @@
+import io
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.cache import touch
+from recipes.models import Recipe
+from tasks.queue import task
+
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1280, 1280),
+}
+FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+
+def encode(image, image_format):
+    """Кодирует изображение без EXIF и прочих метаданных."""
+    buffer = io.BytesIO()
+    image.save(
+        buffer, image_format.upper(),
+        quality=settings.IMAGE_PIPELINE['QUALITY'], optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def load_rgb(file):
+    image = Image.open(file)
+    image.draft('RGB', (settings.IMAGE_PIPELINE['MAX_SIZE'],) * 2)
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+@task
+def process_recipe_image(recipe_id):
+    """Ограничивает размер оригинала и создаёт JPEG/WebP-версии.
+
+    Результат сохраняется, только если за время обработки изображение
+    рецепта не заменили; иначе новые файлы удаляются.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_renditions').first()
+    if recipe is None or not recipe.image:
+        return
+    storage = recipe.image.storage
+    with recipe.image.open('rb') as file:
+        image = load_rgb(file)
+    max_size = settings.IMAGE_PIPELINE['MAX_SIZE']
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    directory = f'recipes/{recipe.pk}/{uuid.uuid4().hex}'
+    saved = [storage.save(f'{directory}/original.jpg', encode(image, 'jpeg'))]
+    renditions = {}
+    for name, size in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.LANCZOS)
+        renditions[name] = {}
+        for image_format, extension in FORMATS.items():
+            path = storage.save(
+                f'{directory}/{name}.{extension}',
+                encode(rendition, image_format))
+            renditions[name][image_format] = path
+            saved.append(path)
+    updated = Recipe.objects.filter(
+        pk=recipe.pk, image=recipe.image.name).update(
+            image=saved[0], image_renditions=renditions,
+            updated_at=timezone.now())
+    if updated:
+        touch('recipes')
+        obsolete = [recipe.image.name] + rendition_paths(
+            recipe.image_renditions)
+    else:
+        obsolete = saved
+    for path in obsolete:
+        storage.delete(path)
+
+
+def rendition_paths(renditions):
+    return [
+        path for formats in renditions.values() for path in formats.values()]
+
+
+@task
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+def delete_image(name, renditions):
+    """Удаляет файл изображения и его копий после коммита."""
+    paths = rendition_paths(renditions)
+    if name:
+        paths.insert(0, name)
+    if paths:
+        delete_files.delay(paths)
+
+
+def schedule_recipe_image(recipe_id):
+    """Ставит обработку изображения в очередь после коммита транзакции."""
+    process_recipe_image.delay(recipe_id)
@@ -0,0 +1,54 @@
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from recipes.bulk import READERS, import_recipes
+
+
+class Command(BaseCommand):
+    help = ('Импортирует рецепты с тегами и ингредиентами из JSON Lines '
+            'или CSV потоковой выгрузки админки, коммитя каждую порцию')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Количество рецептов в одной транзакции')
+        parser.add_argument(
+            '--skip', type=int, default=0,
+            help='Пропустить первые N строк, чтобы продолжить импорт')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        started = time.perf_counter()
+        processed = options['skip']
+
+        def progress(imported, skipped, errors):
+            nonlocal processed
+            processed = options['skip'] + imported + skipped
+            for error in errors:
+                self.stderr.write(error)
+            self.stdout.write(
+                f'Импортировано: {imported}, пропущено: {skipped}, '
+                f'{time.perf_counter() - started:.1f} с')
+
+        with path.open(encoding='utf-8-sig') as file:
+            rows = islice(reader(file), options['skip'], None)
+            try:
+                imported, skipped = import_recipes(
+                    rows, options['chunk_size'], progress,
+                    start=options['skip'] + 1)
+            except DatabaseError as error:
+                raise CommandError(
+                    f'Порция не записана: {error}. Продолжить импорт: '
+                    f'--skip {processed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {imported}, пропущено: {skipped}'))
@@ -0,0 +1,93 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import bump_version
+from recipes.models import Ingredient
+
+# В docker-compose каталог data/ монтируется в /data/ контейнера backend.
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+
+
+def read_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Строка {reader.line_num}: нужны название и единица '
+                f'измерения')
+        yield row[0], row[1]
+
+
+def read_json(file):
+    for number, item in enumerate(json.load(file), start=1):
+        try:
+            yield item['name'], item['measurement_unit']
+        except (KeyError, TypeError):
+            raise CommandError(
+                f'Элемент {number}: нужны name и measurement_unit')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def unique_rows(rows):
+    seen = set()
+    for name, measurement_unit in rows:
+        key = (name.strip(), measurement_unit.strip())
+        if key not in seen:
+            seen.add(key)
+            yield key
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV или JSON пачками bulk_create; '
+        'уже существующие пропускаются')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Файл .csv (название,единица) или .json')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        started = time.perf_counter()
+        processed = 0
+        with path.open(encoding='utf-8') as file, transaction.atomic():
+            before = Ingredient.objects.count()
+            rows = unique_rows(reader(file))
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(
+                        rows, options['batch_size'])]
+                if not batch:
+                    break
+                # Дубли по UniqueConstraint(name, measurement_unit)
+                # пропускает сама база.
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                processed += len(batch)
+            inserted = Ingredient.objects.count() - before
+            transaction.on_commit(lambda: bump_version('ingredient'))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {inserted} из {processed} '
+            f'за {elapsed:.3f} с '
+            f'({inserted / elapsed if elapsed else inserted:.0f} строк/с)'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из рецептов авторов'
+
+    def handle(self, *args, **options):
+        entries = rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(f'Записей лент: {entries}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cart import rebuild_cart_items
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает суммарные ингредиенты списков покупок '
+            'из рецептов в корзинах пользователей')
+
+    def handle(self, *args, **options):
+        items = rebuild_cart_items()
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк списков покупок: {items}'))
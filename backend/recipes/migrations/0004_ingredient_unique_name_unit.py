@@ -0,0 +1,53 @@
+# Generated by Django 3.2.21 on 2026-10-18 19:15
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет один ингредиент на пару (название, единица измерения).
+
+    Рецепты переносятся на ингредиент с наименьшим id; если рецепт
+    ссылался на несколько дубликатов, их количество складывается.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    groups = list(Ingredient.objects.values(
+        'name', 'measurement_unit').annotate(
+            survivor_id=Min('id'), total=Count('id')).filter(
+                total__gt=1).order_by())
+    for group in groups:
+        survivor_id = group['survivor_id']
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']).exclude(
+                id=survivor_id).values_list('id', flat=True))
+        rows = RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids).order_by('id')
+        for row in rows:
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=survivor_id).first()
+            if kept is None:
+                row.ingredient_id = survivor_id
+                row.save(update_fields=('ingredient',))
+            else:
+                kept.amount += row.amount
+                kept.save(update_fields=('amount',))
+                row.delete()
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.21 on 2026-10-18 19:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_cart_items(apps, schema_editor):
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    totals = ShoppingList.objects.filter(
+        recipe__recipeingredient__isnull=False).order_by().values_list(
+            'user_id', 'recipe__recipeingredient__ingredient_id').annotate(
+                total=Sum('recipe__recipeingredient__amount'))
+    ShoppingCartItem.objects.bulk_create((
+        ShoppingCartItem(
+            user_id=user_id, ingredient_id=ingredient_id, total_amount=total)
+        for user_id, ingredient_id, total in totals.iterator()),
+        batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент списка покупок',
+                'verbose_name_plural': 'Ингредиенты списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_item_user_ingredient'),
+        ),
+        migrations.RunPython(fill_cart_items, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (
     MaxValueValidator, MinValueValidator, RegexValidator)
 from django.core.exceptions import ValidationError
@@ -44,6 +45,11 @@ class Ingredient(models.Model):
         verbose_name_plural = 'Ингредиент'
         verbose_name = 'Ингредиенты'
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_unit'),
+        )
 
     def __str__(self):
         return self.name
@@ -61,6 +67,9 @@ class Recipe(models.Model):
     image = models.ImageField(
         upload_to='media/',
         blank=False, verbose_name='Изображение')
+    image_renditions = models.JSONField(
+        verbose_name='Уменьшенные копии изображения', default=dict,
+        blank=True, editable=False)
     text = models.TextField(verbose_name='Описание рецепта')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления, м', default=0,
@@ -70,9 +79,25 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient, related_name='recipes', through='RecipeIngredient')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в избранное', default=0, editable=False)
+    cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в списки покупок', default=0,
+        editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='recipe_created_at_id_idx'),
+            models.Index(
+                fields=('author', '-created_at'),
+                name='recipe_author_created_at_idx'),
+        )
         verbose_name_plural = 'Рецепт'
         verbose_name = 'Рецепты'
 
@@ -91,6 +116,10 @@ class RecipeTag(models.Model):
 
     class Meta:
         unique_together = ('tag', 'recipe')
+        indexes = (
+            models.Index(
+                fields=('recipe', 'tag'), name='recipetag_recipe_tag_idx'),
+        )
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги рецепта'
 
@@ -108,6 +137,11 @@ class RecipeIngredient(models.Model):
 
     class Meta:
         unique_together = ('ingredient', 'recipe')
+        indexes = (
+            models.Index(
+                fields=('recipe', 'ingredient'),
+                name='recipeingr_recipe_ingr_idx'),
+        )
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -126,6 +160,10 @@ class UserRecipe(models.Model):
     class Meta:
         abstract = True
         unique_together = ('user', 'recipe')
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'), name='%(class)s_recipe_user_idx'),
+        )
 
     def __str__(self):
         return f'{self.user} - {self.recipe}'
@@ -154,6 +192,10 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('user', 'author')
+        indexes = (
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -164,3 +206,53 @@ class Follow(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
         return super().save(*args, **kwargs)
+
+
+class ShoppingCartItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='cart_items',
+        verbose_name='Пользователь')
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, related_name='cart_items',
+        verbose_name='Ингредиент')
+    total_amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_item_user_ingredient'),
+        )
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient} - {self.total_amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Пользователь')
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Рецепт')
+    created_at = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_entry'),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at', '-recipe'),
+                name='feedentry_user_created_idx'),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
@@ -0,0 +1,223 @@
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.cache import touch
+from recipes.cart import (
+    decrease_cart_items, increase_cart_items, remove_recipe_from_carts)
+from recipes.counters import update_counter
+from recipes.feed import backfill_feed, remove_authors_from_feed
+from recipes.images import delete_image
+from recipes.models import Favorite, FeedEntry, Follow, Recipe, ShoppingList
+from tasks.queue import task
+from users.models import User
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (ShoppingList, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+DELETE_BATCH_SIZE = 1000
+# Модель, на которую ссылается связь, и её денормализованный счётчик.
+COUNTERS = {
+    'favorites': (Recipe, 'favorites_count'),
+    'cart': (Recipe, 'cart_count'),
+    'following': (User, 'followers_count'),
+}
+
+
+class SortedIds:
+    """Отсортированный массив int64: 8 байт на id, поиск бинарный."""
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __contains__(self, value):
+        position = bisect_left(self._ids, value)
+        return position < len(self._ids) and self._ids[position] == value
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def cache_key(user_id, kind):
+    return f'relations:{user_id}:{kind}'
+
+
+def load_ids(user_id, kind):
+    key = cache_key(user_id, kind)
+    data = cache.get(key)
+    ids = array('q')
+    if data is None:
+        model, field = RELATIONS[kind]
+        ids.extend(model.objects.filter(user_id=user_id).order_by(
+            field).values_list(field, flat=True))
+        cache.set(key, ids.tobytes(), settings.RELATIONS_CACHE_TIMEOUT)
+    else:
+        ids.frombytes(data)
+    return SortedIds(ids)
+
+
+def changed_at_key(user_id):
+    return f'relations:{user_id}:changed_at'
+
+
+def invalidate(user_id, kind):
+    """Сбрасывает кэш связи и запоминает время изменения после коммита."""
+    transaction.on_commit(partial(cache.delete, cache_key(user_id, kind)))
+    transaction.on_commit(partial(
+        cache.set, changed_at_key(user_id), time.time(), None))
+
+
+def relations_changed_at(user_id):
+    """Время последнего изменения избранного, корзины или подписок."""
+    changed_at = cache.get(changed_at_key(user_id))
+    if changed_at is None:
+        cache.add(changed_at_key(user_id), time.time(), None)
+        changed_at = cache.get(changed_at_key(user_id), time.time())
+    return changed_at
+
+
+def run_returning(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def change_counters(kind, object_ids, delta):
+    target, counter_field = COUNTERS[kind]
+    changes = {}
+    if target is Recipe:
+        # Счётчики есть в ответе API, поэтому меняют дату изменения рецепта.
+        changes['updated_at'] = timezone.now()
+        touch('recipes')
+    update_counter(
+        target.objects.filter(id__in=object_ids), counter_field, delta,
+        **changes)
+
+
+@transaction.atomic
+def add_relations(user_id, kind, object_ids):
+    """Создаёт связи одним INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Несуществующие объекты и уже созданные связи пропускаются без
+    ошибок, поэтому повторный и параллельный запросы безопасны.
+    Возвращает id объектов, для которых связь появилась.
+    Требует PostgreSQL или SQLite 3.35+.
+    """
+    object_ids = sorted(set(object_ids))
+    if not object_ids:
+        return []
+    model, field = RELATIONS[kind]
+    target = COUNTERS[kind][0]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(object_ids))
+    # WHERE у SELECT обязателен: без него SQLite не разбирает ON CONFLICT.
+    added = run_returning(
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({quote("user_id")}, {quote(field)}) '
+        f'SELECT %s, {quote("id")} FROM {quote(target._meta.db_table)} '
+        f'WHERE {quote("id")} IN ({placeholders}) '
+        f'ON CONFLICT ({quote("user_id")}, {quote(field)}) DO NOTHING '
+        f'RETURNING {quote(field)}',
+        [user_id, *object_ids])
+    if added:
+        change_counters(kind, added, 1)
+        if kind == 'cart':
+            increase_cart_items(
+                User.objects.filter(id=user_id).values('id'), added)
+        elif kind == 'following':
+            for author_id in added:
+                backfill_feed(user_id, author_id)
+        invalidate(user_id, kind)
+    return added
+
+
+@transaction.atomic
+def remove_relations(user_id, kind, object_ids):
+    """Удаляет связи одним DELETE ... RETURNING.
+
+    Возвращает id объектов, связь с которыми действительно удалена.
+    """
+    object_ids = sorted(set(object_ids))
+    if not object_ids:
+        return []
+    model, field = RELATIONS[kind]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(object_ids))
+    removed = run_returning(
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {quote("user_id")} = %s '
+        f'AND {quote(field)} IN ({placeholders}) '
+        f'RETURNING {quote(field)}',
+        [user_id, *object_ids])
+    if removed:
+        change_counters(kind, removed, -1)
+        if kind == 'cart':
+            decrease_cart_items([user_id], removed)
+        elif kind == 'following':
+            remove_authors_from_feed(user_id, removed)
+        invalidate(user_id, kind)
+    return removed
+
+
+class UserRelations:
+    """Избранное, корзина и подписки пользователя.
+
+    Каждый набор id загружается не более раза за запрос: из общего
+    кэша или, при промахе, одним запросом к базе.
+    """
+
+    def __init__(self, user):
+        self.user_id = None if user.is_anonymous else user.id
+        self._loaded = {}
+
+    def has(self, kind, object_id):
+        if self.user_id is None:
+            return False
+        if kind not in self._loaded:
+            self._loaded[kind] = load_ids(self.user_id, kind)
+        return object_id in self._loaded[kind]
+
+
+def get_relations(request):
+    relations = getattr(request, '_user_relations', None)
+    if relations is None:
+        relations = UserRelations(request.user)
+        request._user_relations = relations
+    return relations
+
+
+@task
+def delete_recipe(recipe_id):
+    """Удаляет рецепт в фоне.
+
+    Избранное и записи лент удаляются порциями по DELETE_BATCH_SIZE
+    строк в отдельных транзакциях, чтобы не держать долгих блокировок;
+    сам рецепт с корзинами и счётчиком автора - одной транзакцией.
+    """
+    for model in (Favorite, FeedEntry):
+        while True:
+            ids = list(model.objects.filter(recipe_id=recipe_id).values_list(
+                'id', flat=True)[:DELETE_BATCH_SIZE])
+            if not ids:
+                break
+            model.objects.filter(id__in=ids).delete()
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            id=recipe_id).first()
+        if recipe is None:
+            return
+        remove_recipe_from_carts(recipe)
+        recipe.delete()
+        delete_image(recipe.image.name, recipe.image_renditions)
+        update_counter(
+            User.objects.filter(id=recipe.author_id), 'recipes_count', -1)
@@ -0,0 +1,132 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector)
+from django.db import connection, transaction
+from django.db.models import (
+    Case, F, FloatField, OuterRef, Subquery, TextField, Value, When)
+from django.db.models.functions import Coalesce
+
+from recipes.cache import bump_version, get_version
+from recipes.models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+# Веса как у ts_rank по умолчанию: A - название, B - ингредиенты,
+# C - описание.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+TOKEN_RE = re.compile(r'\w+')
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')).values('names'),
+        output_field=TextField())
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(ingredient_names, Value(''), output_field=TextField()),
+            weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG))
+
+
+def update_search_vectors(queryset=None):
+    """Пересчитывает поисковый вектор рецептов после их изменения."""
+    if uses_search_vector():
+        if queryset is None:
+            queryset = Recipe.objects.all()
+        queryset.update(search_vector=search_vector())
+    else:
+        transaction.on_commit(lambda: bump_version('recipe_search'))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+class RecipeSearchIndex:
+    """Инвертированный индекс рецептов в памяти для СУБД без tsvector.
+
+    Токены запроса ищутся как префиксы токенов индекса, поэтому
+    «блин» находит «блины». Рецепт должен содержать все токены запроса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = ()
+        self._postings = {}
+        self._version = None
+
+    def _add(self, postings, recipe_id, text, weight):
+        for token in tokenize(text):
+            current = postings[token].get(recipe_id, 0)
+            postings[token][recipe_id] = max(current, WEIGHTS[weight])
+
+    def _build(self):
+        postings = defaultdict(dict)
+        for recipe_id, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text').order_by().iterator():
+            self._add(postings, recipe_id, name, 'A')
+            self._add(postings, recipe_id, text, 'C')
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient__name').order_by().iterator():
+            self._add(postings, recipe_id, name, 'B')
+        self._tokens = tuple(sorted(postings))
+        self._postings = dict(postings)
+
+    def _ensure_built(self):
+        version = get_version('recipe_search')
+        with self._lock:
+            if self._version != version:
+                self._build()
+                self._version = version
+            return self._tokens, self._postings
+
+    def search(self, query):
+        """Словарь {id рецепта: релевантность}."""
+        tokens, postings = self._ensure_built()
+        scores = None
+        for term in tokenize(query):
+            matches = {}
+            for position in range(bisect_left(tokens, term), len(tokens)):
+                if not tokens[position].startswith(term):
+                    break
+                for recipe_id, weight in postings[tokens[position]].items():
+                    matches[recipe_id] = max(matches.get(recipe_id, 0), weight)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    recipe_id: score + matches[recipe_id]
+                    for recipe_id, score in scores.items()
+                    if recipe_id in matches}
+        return scores or {}
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, по убыванию релевантности."""
+    if uses_search_vector():
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)).order_by(
+                '-rank', '-created_at')
+    scores = recipe_search_index.search(query)
+    if not scores:
+        return queryset.none()
+    return queryset.filter(pk__in=scores).annotate(rank=Case(
+        *(When(pk=recipe_id, then=Value(score))
+          for recipe_id, score in scores.items()),
+        output_field=FloatField())).order_by('-rank', '-created_at')
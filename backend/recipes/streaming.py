@@ -0,0 +1,5 @@
+class Echo:
+    """Псевдо-буфер: csv.writer отдаёт строку, а не пишет её в файл."""
+
+    def write(self, value):
+        return value
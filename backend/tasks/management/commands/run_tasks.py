@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.queue import claim_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из таблицы очереди '
+            '(TASKS_BACKEND=database)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS['WORKERS'],
+            help='Сколько задач выполнять параллельно')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        results = []
+        with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='tasks') as executor:
+            try:
+                while True:
+                    tasks = claim_tasks(workers)
+                    if tasks:
+                        results.extend(executor.map(run_task, tasks))
+                    elif options['once']:
+                        break
+                    else:
+                        time.sleep(settings.TASKS['POLL_INTERVAL'])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {results.count(True)}, '
+            f'с ошибкой: {results.count(False)}'))
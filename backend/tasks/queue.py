@@ -0,0 +1,139 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def task(func=None, max_attempts=None):
+    """Помечает функцию как фоновую задачу и добавляет ей метод delay.
+
+    Аргументы задачи сохраняются в JSON, поэтому передавать нужно id
+    и простые значения, а не объекты моделей.
+    """
+    if func is None:
+        return partial(task, max_attempts=max_attempts)
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+    func.max_attempts = max_attempts
+    func.delay = partial(enqueue, func)
+    return func
+
+
+def enqueue(func, *args):
+    """Передаёт задачу бэкенду TASKS['BACKEND'] после коммита транзакции."""
+    max_attempts = func.max_attempts or settings.TASKS['MAX_ATTEMPTS']
+    backend = BACKENDS[settings.TASKS['BACKEND']]
+    transaction.on_commit(
+        partial(backend, func.task_name, list(args), max_attempts))
+
+
+def retry_delay(attempt):
+    """Экспоненциальная пауза перед повтором: RETRY_DELAY * 2^(n - 1)."""
+    return settings.TASKS['RETRY_DELAY'] * 2 ** (attempt - 1)
+
+
+def execute(name, args):
+    import_string(name)(*args)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS['WORKERS'],
+            thread_name_prefix='tasks')
+    return _executor
+
+
+def run_immediately(name, args, max_attempts):
+    execute(name, args)
+
+
+def run_local(name, args, max_attempts, attempt=1):
+    """Выполняет задачу в потоке процесса и повторяет её по таймеру."""
+    try:
+        execute(name, args)
+    except Exception:
+        if attempt >= max_attempts:
+            logger.exception('Задача %s%s не выполнена', name, tuple(args))
+            return
+        logger.warning('Задача %s%s упала, попытка %s из %s', name,
+                       tuple(args), attempt, max_attempts, exc_info=True)
+        timer = threading.Timer(retry_delay(attempt), submit_local, (
+            name, args, max_attempts, attempt + 1))
+        timer.daemon = True
+        timer.start()
+    finally:
+        connections.close_all()
+
+
+def submit_local(name, args, max_attempts, attempt=1):
+    get_executor().submit(run_local, name, args, max_attempts, attempt)
+
+
+def save_task(name, args, max_attempts):
+    Task.objects.create(
+        name=name, args=args, max_attempts=max_attempts,
+        run_at=timezone.now())
+
+
+BACKENDS = {
+    'immediate': run_immediately,
+    'local': submit_local,
+    'database': save_task,
+}
+
+
+def claim_tasks(limit):
+    """Берёт в работу до limit готовых задач из таблицы.
+
+    Строки блокируются с SKIP LOCKED, поэтому несколько воркеров не
+    получат одну задачу. Задачи, которые висят в работе дольше
+    TASKS['TIMEOUT'] секунд (воркер упал), выдаются повторно.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKS['TIMEOUT'])
+    with transaction.atomic():
+        ids = list(Task.objects.filter(
+            Q(status=Task.QUEUED, run_at__lte=now)
+            | Q(status=Task.RUNNING, locked_at__lt=stale)
+        ).order_by('run_at').select_for_update(
+            skip_locked=True).values_list('id', flat=True)[:limit])
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+    return list(Task.objects.filter(id__in=ids))
+
+
+def run_task(task):
+    """Выполняет задачу из таблицы: удаляет при успехе, иначе откладывает."""
+    close_old_connections()
+    try:
+        execute(task.name, task.args)
+    except Exception:
+        logger.warning('Задача %s упала, попытка %s из %s', task,
+                       task.attempts, task.max_attempts, exc_info=True)
+        failed = task.attempts >= task.max_attempts
+        Task.objects.filter(id=task.id).update(
+            status=Task.FAILED if failed else Task.QUEUED,
+            run_at=timezone.now() + timedelta(
+                seconds=retry_delay(task.attempts)),
+            locked_at=None, last_error=traceback.format_exc())
+        return False
+    else:
+        Task.objects.filter(id=task.id).delete()
+        return True
+    finally:
+        close_old_connections()
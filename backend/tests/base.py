@@ -0,0 +1,70 @@
+import base64
+import io
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def image_data(color='red'):
+    """PNG в base64, как его присылает фронтенд."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class APITestCase(TestCase):
+    """Пользователи, теги и ингредиенты; клиент от имени первого."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com', username=f'user{i}',
+                first_name='Имя', last_name='Фамилия',
+                password='password-123')
+            for i in range(3)]
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(3)]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def create_recipes(self, count, author=None):
+        recipes = []
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                author=author or self.users[1], name=f'Рецепт {i}',
+                image='recipes/images/test.png', text='Описание',
+                cooking_time=5)
+            recipe.tags.set(self.tags[:2])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=i + 1)
+                for ingredient in self.ingredients[:3])
+            recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, url, client=None):
+        """Число SQL-запросов на прогретом кэше."""
+        client = client or self.client
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
@@ -0,0 +1,127 @@
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.test import override_settings
+
+from recipes.models import (
+    Favorite, Follow, Recipe, ShoppingCartItem, ShoppingList)
+from users.models import User
+from .base import APITestCase
+
+
+@override_settings(TASKS={'BACKEND': 'immediate', 'MAX_ATTEMPTS': 1})
+class AdminConsistencyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админ', password='password-123')
+        self.recipe, = self.create_recipes(1)
+        for relation in ('favorite', 'shopping_cart'):
+            self.client.post(f'/api/recipes/{self.recipe.id}/{relation}/')
+        self.client.force_authenticate(None)
+        self.client.force_login(self.admin)
+
+    def cart(self):
+        return dict(ShoppingCartItem.objects.filter(
+            user=self.users[0]).values_list('ingredient_id', 'total_amount'))
+
+    def delete_selected(self, model, ids):
+        return self.client.post(f'/admin/recipes/{model}/', {
+            'action': 'delete_selected', 'post': 'yes',
+            ACTION_CHECKBOX_NAME: ids})
+
+    def test_relation_deletes_update_counters_and_cart(self):
+        self.delete_selected('favorite', list(
+            Favorite.objects.values_list('id', flat=True)))
+        self.delete_selected('shoppinglist', list(
+            ShoppingList.objects.values_list('id', flat=True)))
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual((recipe.favorites_count, recipe.cart_count), (0, 0))
+        self.assertEqual(self.cart(), {})
+
+    def test_relation_add_updates_counters(self):
+        response = self.client.post('/admin/recipes/follow/add/', {
+            'user': self.users[0].id, 'author': self.users[1].id})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Follow.objects.filter(
+            user=self.users[0], author=self.users[1]).exists())
+        self.assertEqual(
+            User.objects.get(pk=self.users[1].pk).followers_count, 1)
+
+    def test_recipe_delete_updates_cart_and_author(self):
+        User.objects.filter(pk=self.users[1].pk).update(recipes_count=1)
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.id}/delete/',
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Recipe.objects.filter(pk=self.recipe.pk).exists())
+        self.assertEqual(self.cart(), {})
+        self.assertEqual(
+            User.objects.get(pk=self.users[1].pk).recipes_count, 0)
+
+    def test_inline_ingredients_update_cart(self):
+        items = list(self.recipe.recipeingredient.order_by('id'))
+        data = {
+            'name': self.recipe.name, 'text': self.recipe.text,
+            'cooking_time': 5,
+            'recipeingredient-TOTAL_FORMS': len(items),
+            'recipeingredient-INITIAL_FORMS': len(items),
+        }
+        tags = list(self.recipe.recipetag_set.order_by('id'))
+        data.update({
+            'recipetag_set-TOTAL_FORMS': len(tags),
+            'recipetag_set-INITIAL_FORMS': len(tags)})
+        for number, tag in enumerate(tags):
+            prefix = f'recipetag_set-{number}-'
+            data.update({
+                prefix + 'id': tag.id, prefix + 'recipe': self.recipe.id,
+                prefix + 'tag': tag.tag_id})
+        for number, item in enumerate(items):
+            prefix = f'recipeingredient-{number}-'
+            data.update({
+                prefix + 'id': item.id, prefix + 'recipe': self.recipe.id,
+                prefix + 'ingredient': item.ingredient_id,
+                prefix + 'amount': 10})
+        data['recipeingredient-2-DELETE'] = 'on'
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.id}/change/', data)
+        self.assertEqual(response.status_code, 302, response.content[:2000])
+        self.assertEqual(self.cart(), {
+            items[0].ingredient_id: 10, items[1].ingredient_id: 10})
+
+
+class AdminQueriesTests(APITestCase):
+    CHANGELISTS = (
+        '/admin/recipes/recipe/', '/admin/recipes/favorite/',
+        '/admin/recipes/shoppinglist/', '/admin/recipes/follow/')
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админ', password='password-123')
+        self.client.force_authenticate(None)
+        self.client.force_login(admin)
+
+    def add_rows(self, count):
+        for recipe in self.create_recipes(count):
+            for user in self.users:
+                Favorite.objects.get_or_create(user=user, recipe=recipe)
+                ShoppingList.objects.get_or_create(user=user, recipe=recipe)
+        for user in self.users:
+            for author in self.users:
+                if user != author:
+                    Follow.objects.get_or_create(user=user, author=author)
+
+    def test_changelists_do_not_depend_on_rows(self):
+        self.add_rows(1)
+        small = [self.count_queries(url) for url in self.CHANGELISTS]
+        self.add_rows(3)
+        self.assertEqual(
+            [self.count_queries(url) for url in self.CHANGELISTS], small)
+
+    def test_change_form_and_autocomplete(self):
+        recipe, = self.create_recipes(1)
+        for url in (f'/admin/recipes/recipe/{recipe.id}/change/',
+                    '/admin/autocomplete/?app_label=recipes'
+                    '&model_name=recipe&field_name=author&term=user'):
+            self.assertEqual(self.client.get(url).status_code, 200)
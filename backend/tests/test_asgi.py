@@ -0,0 +1,71 @@
+import asyncio
+from unittest import mock
+
+from django.test import TransactionTestCase
+from django.test.client import AsyncRequestFactory
+from rest_framework.authtoken.models import Token
+
+from api import handlers
+from api.handlers import ReadPoolASGIHandler
+from recipes.models import Ingredient, ShoppingCartItem
+from users.models import User
+
+
+async def call_asgi(application, method, path, **extra):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = getattr(AsyncRequestFactory(), method)(path, **extra).scope
+    await application(scope, receive, send)
+    return messages
+
+
+class ReadPoolASGIHandlerTests(TransactionTestCase):
+    def call(self, *requests):
+        application = ReadPoolASGIHandler()
+
+        async def main():
+            return await asyncio.gather(*(
+                call_asgi(application, method, path)
+                for method, path in requests))
+
+        with mock.patch.object(
+                handlers, 'run_read_view',
+                wraps=handlers.run_read_view) as run_read_view:
+            responses = asyncio.run(main())
+        statuses = [messages[0]['status'] for messages in responses]
+        return statuses, run_read_view.call_count
+
+    def test_reads_run_in_pool(self):
+        statuses, pooled = self.call(
+            ('get', '/api/recipes/'), ('get', '/api/tags/'),
+            ('get', '/api/ingredients/'))
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(pooled, 3)
+
+    def test_writes_stay_in_main_thread(self):
+        statuses, pooled = self.call(('post', '/api/recipes/'))
+        self.assertEqual(statuses, [401])
+        self.assertEqual(pooled, 0)
+
+    def test_shopping_list_streamed(self):
+        user = User.objects.create_user(
+            email='user@example.com', username='user', first_name='Имя',
+            last_name='Фамилия', password='password-123')
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        ShoppingCartItem.objects.create(
+            user=user, ingredient=ingredient, total_amount=5)
+        token = Token.objects.create(user=user)
+        messages = asyncio.run(call_asgi(
+            ReadPoolASGIHandler(), 'get',
+            '/api/recipes/download_shopping_cart/',
+            authorization=f'Token {token.key}'))
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertEqual(body.decode(), 'соль - 5 г\n')
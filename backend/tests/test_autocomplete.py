@@ -0,0 +1,35 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+from .base import APITestCase
+
+AUTOCOMPLETE_URL = '/api/ingredients/autocomplete/?name='
+
+
+class AutocompleteTests(APITestCase):
+    def names(self, query):
+        response = APIClient().get(AUTOCOMPLETE_URL + query)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_matches_first(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('абрикос', 'сушёный абрикос', 'абрикосовый джем'):
+                Ingredient.objects.create(name=name, measurement_unit='г')
+        for query in ('абр', 'абрикос', 'АБР'):
+            self.assertEqual(self.names(query), [
+                'абрикос', 'абрикосовый джем', 'сушёный абрикос'])
+
+    def test_short_query_served_from_memory(self):
+        self.names('инг')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(len(self.names('инг')), 5)
+        self.assertEqual(len(context), 0)
+
+    def test_new_ingredient_invalidates_cache(self):
+        self.assertEqual(self.names('мас'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='масло', measurement_unit='г')
+        self.assertEqual(self.names('мас'), ['масло'])
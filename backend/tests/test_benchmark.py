@@ -0,0 +1,16 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from api.benchmark import run_benchmark
+
+
+class BenchmarkTests(TestCase):
+    def test_all_scenarios_succeed(self):
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            run = run_benchmark(20, 1)
+        self.assertEqual(run['recipes'], 20)
+        self.assertIn('subscriptions', run['scenarios'])
+        for name, result in run['scenarios'].items():
+            self.assertGreater(result['queries'], 0, name)
@@ -0,0 +1,103 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .base import APITestCase
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe, = self.create_recipes(1, author=self.users[0])
+        self.urls = (f'/api/recipes/{self.recipe.id}/', '/api/recipes/')
+
+    def etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls]
+
+    def assertETagsChanged(self, etags):
+        for old, new in zip(etags, self.etags()):
+            self.assertNotEqual(old, new)
+
+    def test_not_modified(self):
+        self.etags()
+        # Last-Modified отдаётся, когда секунда изменения уже прошла.
+        with mock.patch('time.time', return_value=time.time() + 2):
+            for url in self.urls:
+                response = self.client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                for header, value in (
+                        ('HTTP_IF_NONE_MATCH', response['ETag']),
+                        ('HTTP_IF_MODIFIED_SINCE',
+                         response['Last-Modified'])):
+                    self.assertEqual(self.client.get(
+                        url, **{header: value}).status_code, 304)
+
+    def modified_at(self, now):
+        """Переименовывает тег в момент now."""
+        with mock.patch('time.time', return_value=now):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.tags[0].name = f'Тег {now}'
+                self.tags[0].save()
+
+    def get_at(self, now, **headers):
+        with mock.patch('time.time', return_value=now):
+            return self.client.get(self.urls[1], **headers)
+
+    def test_change_in_same_second(self):
+        self.modified_at(1000.2)
+        # Секунда изменения ещё идёт: только ETag.
+        self.assertNotIn('Last-Modified', self.get_at(1000.5))
+        last_modified = self.get_at(1001.5)['Last-Modified']
+        self.assertEqual(last_modified, 'Thu, 01 Jan 1970 00:16:41 GMT')
+        self.assertEqual(self.get_at(
+            1001.6, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.modified_at(1001.7)
+        self.assertEqual(self.get_at(
+            1002.5, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_not_found(self):
+        for url in ('/api/recipes/abc/', '/api/recipes/999/'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_favorite_changes_etag(self):
+        etags = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertETagsChanged(etags)
+
+    def test_update_changes_etag(self):
+        etags = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.urls[0], {
+                'tags': [self.tags[2].id],
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 2}]},
+                format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertETagsChanged(etags)
+
+    def test_tag_rename_changes_etag(self):
+        etags = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags[0].name = 'Переименован'
+            self.tags[0].save()
+        self.assertETagsChanged(etags)
+
+    def test_anonymous_public(self):
+        response = APIClient().get('/api/recipes/')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_not_modified_saves_queries(self):
+        self.create_recipes(5)
+        etag = self.client.get(self.urls[1])['ETag']
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.urls[1])
+        with CaptureQueriesContext(connection) as hit:
+            response = self.client.get(
+                self.urls[1], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertLess(len(hit), len(full))
@@ -0,0 +1,76 @@
+from django.test import override_settings
+
+from recipes.counters import recount
+from recipes.models import Favorite, Follow, Recipe, ShoppingList
+from users.models import User
+from .base import APITestCase, image_data
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe, = self.create_recipes(1)
+
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        return recipe.favorites_count, recipe.cart_count
+
+    def test_favorite_and_cart(self):
+        for relation in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{self.recipe.id}/{relation}/'
+            self.assertEqual(self.client.post(url).status_code, 201)
+            self.client.post(url)
+        self.assertEqual(self.counters(), (1, 1))
+        for relation in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{self.recipe.id}/{relation}/'
+            self.assertEqual(self.client.delete(url).status_code, 204)
+            self.client.delete(url)
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_followers_count(self):
+        url = f'/api/users/{self.users[1].id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        author = User.objects.get(pk=self.users[1].pk)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 0)
+
+    @override_settings(TASKS={'BACKEND': 'immediate', 'MAX_ATTEMPTS': 1})
+    def test_recipes_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'name': 'Новый', 'text': 'Описание', 'cooking_time': 10,
+                'image': image_data(), 'tags': [self.tags[0].id],
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 5}]},
+                format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        user = User.objects.get(pk=self.users[0].pk)
+        self.assertEqual(user.recipes_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(
+                f'/api/recipes/{response.data["id"]}/').status_code, 204)
+        user.refresh_from_db()
+        self.assertEqual(user.recipes_count, 0)
+
+    def test_decrement_does_not_go_below_zero(self):
+        Favorite.objects.create(user=self.users[0], recipe=self.recipe)
+        ShoppingList.objects.create(user=self.users[0], recipe=self.recipe)
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        for url in (f'/api/recipes/{self.recipe.id}/favorite/',
+                    f'/api/recipes/{self.recipe.id}/shopping_cart/',
+                    f'/api/users/{self.users[1].id}/subscribe/'):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.counters(), (0, 0))
+        self.assertEqual(
+            User.objects.get(pk=self.users[1].pk).followers_count, 0)
+
+    def test_recount(self):
+        Favorite.objects.create(user=self.users[0], recipe=self.recipe)
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        recount()
+        self.assertEqual(self.counters(), (1, 0))
+        author = User.objects.get(pk=self.users[1].pk)
+        self.assertEqual(
+            (author.recipes_count, author.followers_count), (1, 1))
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.management import call_command
+from django.db import connection
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client, TransactionTestCase
+from django.test.client import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api.handlers import ReadPoolASGIHandler
+from recipes.models import FeedEntry, Follow, Recipe
+from users.models import User
+from .base import APITestCase
+
+
+def post_asgi(application, path, data, cookies):
+    body = urlencode(data, doseq=True).encode()
+    factory = AsyncRequestFactory()
+    factory.cookies = cookies
+    scope = factory.post(
+        path, body, content_type='application/x-www-form-urlencoded').scope
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return messages
+
+
+class StreamingExportTests(TransactionTestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com', username=f'user{i}',
+                first_name='Имя', last_name='Фамилия',
+                password='password-123')
+            for i in range(3)]
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админ', password='password-123')
+        client = Client()
+        client.force_login(admin)
+        self.cookies = client.cookies
+        self.csrf_token = _get_new_csrf_token()
+        self.cookies['csrftoken'] = self.csrf_token
+
+    def test_jsonl_export_under_asgi(self):
+        messages = post_asgi(ReadPoolASGIHandler(), '/admin/users/user/', {
+            'action': 'stream_export_jsonl',
+            ACTION_CHECKBOX_NAME: [user.id for user in self.users],
+            'csrfmiddlewaretoken': self.csrf_token,
+        }, self.cookies)
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(
+            message.get('body', b'') for message in messages[1:])
+        emails = [json.loads(line)['email'] for line in body.splitlines()]
+        self.assertEqual(emails, [user.email for user in self.users])
+
+
+class RecipeTransferTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админ', password='password-123')
+        self.client.force_login(admin)
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        self.recipes = self.create_recipes(3)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def export(self, export_format):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/admin/recipes/recipe/', {
+                'action': f'stream_export_{export_format}',
+                ACTION_CHECKBOX_NAME: [recipe.id for recipe in self.recipes]})
+            self.assertEqual(response.status_code, 200)
+            body = b''.join(response.streaming_content).decode()
+        self.assertLess(len(context), 12)
+        return body
+
+    def import_file(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_recipes', str(path), '--chunk-size', '2',
+                     stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_export(self):
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(sorted(rows[0]['tags']), ['tag0', 'tag1'])
+        self.assertEqual(len(rows[0]['ingredients']), 3)
+        self.assertIn('author__email', self.export('csv').splitlines()[0])
+
+    def test_user_export_has_no_passwords(self):
+        response = self.client.post('/admin/users/user/', {
+            'action': 'stream_export_csv',
+            ACTION_CHECKBOX_NAME: [user.id for user in self.users]})
+        self.assertNotIn(b'password', b''.join(response.streaming_content))
+
+    def test_import(self):
+        jsonl, csv = self.export('jsonl'), self.export('csv')
+        bad = dict(json.loads(jsonl.splitlines()[0]), tags=['unknown'])
+        Recipe.objects.all().delete()
+        stdout, stderr = self.import_file(
+            'recipes.jsonl', jsonl + json.dumps(bad) + '\n')
+        self.assertIn('Импортировано рецептов: 3', stdout)
+        self.assertIn('пропущено: 1', stdout)
+        self.assertIn('Строка 4: тег unknown не найден', stderr)
+        stdout, _ = self.import_file('recipes.csv', csv)
+        self.assertIn('Импортировано рецептов: 3', stdout)
+        self.assertEqual(Recipe.objects.count(), 6)
+        author = User.objects.get(pk=self.users[1].pk)
+        self.assertEqual(author.recipes_count, 6)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.users[0]).count(), 6)
+        recipe = Recipe.objects.first()
+        self.assertEqual(recipe.recipeingredient.count(), 3)
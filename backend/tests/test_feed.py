@@ -0,0 +1,100 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.feed import rebuild_feeds
+from recipes.models import FeedEntry
+from .base import APITestCase, image_data
+
+FEED_URL = '/api/recipes/feed/'
+
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = APIClient()
+        self.author.force_authenticate(self.users[1])
+
+    def post_recipe(self, name):
+        response = self.author.post('/api/recipes/', {
+            'name': name, 'text': 'Описание', 'cooking_time': 5,
+            'image': image_data(), 'tags': [self.tags[0].id],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}]},
+            format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def subscribe(self, author):
+        response = self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+
+    def feed(self, url=FEED_URL):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def capture(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return context
+
+    def test_backfill_and_fan_out(self):
+        old = self.create_recipes(3, author=self.users[2])
+        self.subscribe(self.users[1])
+        self.subscribe(self.users[2])
+        new = [self.post_recipe(f'Рецепт {i}') for i in range(4)]
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.users[0]).count(), 7)
+        self.assertEqual(
+            self.feed(FEED_URL + '?limit=3'),
+            new[::-1] + [recipe.id for recipe in reversed(old)])
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.subscribe(self.users[1])
+        for i in range(6):
+            self.post_recipe(f'Рецепт {i}')
+        small = len(self.capture(FEED_URL + '?limit=2'))
+        self.assertEqual(len(self.capture(FEED_URL + '?limit=6')), small)
+
+    def test_unsubscribe(self):
+        old = self.create_recipes(2, author=self.users[2])
+        self.subscribe(self.users[1])
+        self.subscribe(self.users[2])
+        self.post_recipe('Новый')
+        self.client.delete(f'/api/users/{self.users[1].id}/subscribe/')
+        self.assertEqual(
+            self.feed(), [recipe.id for recipe in reversed(old)])
+
+    def test_popular_author_read_on_request(self):
+        self.subscribe(self.users[1])
+        first = self.post_recipe('Первый')
+        with override_settings(FEED={
+                'FANOUT_MAX_FOLLOWERS': 0, 'BACKFILL': 100}):
+            second = self.post_recipe('Второй')
+            self.assertEqual(
+                FeedEntry.objects.filter(recipe_id=second).count(), 0)
+            self.assertEqual(self.feed(FEED_URL + '?limit=1'),
+                             [second, first])
+
+    def test_rebuild(self):
+        self.create_recipes(2, author=self.users[1])
+        self.subscribe(self.users[1])
+        entries = list(FeedEntry.objects.values_list(
+            'user_id', 'recipe_id').order_by('recipe_id'))
+        FeedEntry.objects.all().delete()
+        rebuild_feeds()
+        self.assertEqual(list(FeedEntry.objects.values_list(
+            'user_id', 'recipe_id').order_by('recipe_id')), entries)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(FEED_URL + '?cursor=zzz')
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous(self):
+        self.assertEqual(APIClient().get(FEED_URL).status_code, 401)
@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+
+from recipes.relations import delete_recipe
+from .base import APITestCase, image_data
+
+
+@override_settings(TASKS={'BACKEND': 'immediate', 'MAX_ATTEMPTS': 1})
+class RecipeImageTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def files(self):
+        return sorted(
+            str(path.relative_to(self.media))
+            for path in self.media.rglob('*') if path.is_file())
+
+    def post(self, method, url, color):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, {
+                'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+                'image': image_data(color), 'tags': [self.tags[0].id],
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 5}]},
+                format='json')
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def test_replaced_and_deleted_images_leave_no_files(self):
+        recipe_id = self.post('post', '/api/recipes/', 'red').data['id']
+        first = self.files()
+        self.assertEqual(len(first), 7)
+        url = f'/api/recipes/{recipe_id}/'
+        self.post('patch', url, 'blue')
+        second = self.files()
+        self.assertEqual(len(second), 7)
+        self.assertFalse(set(first) & set(second))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(len(callbacks), 1)
+        # Задача удаления ставит удаление файлов в очередь своим
+        # on_commit, поэтому выполняется отдельно.
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_recipe(recipe_id)
+        self.assertEqual(self.files(), [])
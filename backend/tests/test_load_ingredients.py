@@ -0,0 +1,42 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class LoadIngredientsTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def load(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        output = StringIO()
+        call_command('load_ingredients', str(path), stdout=output)
+        return output.getvalue()
+
+    def test_reports_inserted_rows(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        output = self.load('a.csv', 'соль,г\nсахар,г\nсахар,г\nмука, г\n')
+        self.assertIn('Добавлено ингредиентов: 2 из 3', output)
+        output = self.load(
+            'b.json', '[{"name": "мука", "measurement_unit": "г"}]')
+        self.assertIn('Добавлено ингредиентов: 0 из 1', output)
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_invalid_rows(self):
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.load('c.csv', 'соль,г\nсахар\n')
+        with self.assertRaisesMessage(CommandError, 'Элемент 1'):
+            self.load('d.json', '[{"name": "соль"}]')
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_default_file(self):
+        call_command('load_ingredients', stdout=StringIO())
+        self.assertTrue(Ingredient.objects.exists())
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateIngredientsTests(TransactionTestCase):
+    before = [('recipes', '0003_ingredient_name_search_indexes'),
+              ('users', '0003_user_counters')]
+    after = [('recipes', '0004_ingredient_unique_name_unit'),
+             ('users', '0003_user_counters')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_merged(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('users', 'User')
+        Ingredient = apps.get_model('recipes', 'Ingredient')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        author = User.objects.create(
+            email='user@example.com', username='user', first_name='Имя',
+            last_name='Фамилия')
+        salt, salt_copy, other_salt_copy = (
+            Ingredient.objects.create(name='соль', measurement_unit='г')
+            for _ in range(3))
+        salt_kg = Ingredient.objects.create(
+            name='соль', measurement_unit='кг')
+        both, copy_only = (
+            Recipe.objects.create(
+                author=author, name=name, image='recipes/images/test.png',
+                text='Описание', cooking_time=5)
+            for name in ('Оба', 'Копия'))
+        RecipeIngredient.objects.bulk_create((
+            RecipeIngredient(recipe=both, ingredient=salt, amount=2),
+            RecipeIngredient(recipe=both, ingredient=salt_copy, amount=3),
+            RecipeIngredient(
+                recipe=both, ingredient=other_salt_copy, amount=4),
+            RecipeIngredient(recipe=copy_only, ingredient=salt_copy, amount=5),
+            RecipeIngredient(recipe=copy_only, ingredient=salt_kg, amount=1),
+        ))
+
+        apps = self.migrate(self.after)
+        Ingredient = apps.get_model('recipes', 'Ingredient')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        self.assertEqual(
+            set(Ingredient.objects.values_list('id', flat=True)),
+            {salt.id, salt_kg.id})
+        self.assertEqual(
+            set(RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient_id', 'amount')),
+            {(both.id, salt.id, 9), (copy_only.id, salt.id, 5),
+             (copy_only.id, salt_kg.id, 1)})
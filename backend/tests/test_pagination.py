@@ -0,0 +1,39 @@
+from recipes.models import Follow
+from .base import APITestCase
+
+
+class CursorPaginationTests(APITestCase):
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_recipes(self):
+        recipes = self.create_recipes(5)
+        self.assertEqual(
+            self.collect('/api/recipes/?pagination=cursor&limit=2'),
+            [recipe.id for recipe in reversed(recipes)])
+
+    def test_recipes_with_ordering(self):
+        self.create_recipes(3)
+        response = self.client.get(
+            '/api/recipes/?pagination=cursor&ordering=-favorites_count')
+        self.assertEqual(response.status_code, 200)
+
+    def test_page_number_by_default(self):
+        self.create_recipes(3)
+        response = self.client.get('/api/recipes/?limit=2')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_subscriptions(self):
+        for author in self.users[1:]:
+            Follow.objects.create(user=self.users[0], author=author)
+        self.assertCountEqual(
+            self.collect('/api/users/subscriptions/'
+                         '?pagination=cursor&limit=1&recipes_limit=1'),
+            [author.id for author in self.users[1:]])
@@ -0,0 +1,162 @@
+import threading
+from unittest import mock
+
+import psycopg2
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from foodgram_backend.postgresql import base
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def execute(self, sql, params=None):
+        if self.connection.broken:
+            # Так psycopg2 помечает соединение, которое закрыл сервер.
+            self.connection.closed = 2
+            raise psycopg2.OperationalError('server closed the connection')
+        self.connection.executed.append((sql, params))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Соединение psycopg2 без сервера: запоминает выполненные запросы."""
+
+    def __init__(self, **conn_params):
+        self.conn_params = conn_params
+        self.executed = []
+        self.broken = False
+        self.closed = 0
+        self.autocommit = False
+        self.isolation_level = extensions.ISOLATION_LEVEL_READ_COMMITTED
+        self.info = mock.Mock(
+            transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def get_parameter_status(self, name):
+        return 'UTC'
+
+    def set_client_encoding(self, encoding):
+        pass
+
+    def set_session(self, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class PostgreSQLBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        patches = (
+            mock.patch('psycopg2.connect', side_effect=FakeConnection),
+            mock.patch('psycopg2.extras.register_default_jsonb'),
+            mock.patch.object(base, 'register_default_jsonb'),
+            mock.patch.dict(base._pools, clear=True),
+            mock.patch.dict(base.stats, clear=True))
+        self.connect = patches[0].start()
+        for patch in patches[1:]:
+            patch.start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def make_wrapper(self, **settings_dict):
+        settings_dict = {
+            'ENGINE': 'foodgram_backend.postgresql', 'NAME': 'foodgram',
+            'CONN_MAX_AGE': 60, **settings_dict}
+        wrapper = ConnectionHandler({'default': settings_dict})['default']
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def make_pooled_wrapper(self, **settings_dict):
+        return self.make_wrapper(OPTIONS={'pool': {
+            'min_size': 1, 'max_size': 2, 'timeout': 1}}, **settings_dict)
+
+
+class ConnectionPoolTests(PostgreSQLBackendTestCase):
+    def test_checkout_and_return(self):
+        wrapper = self.make_pooled_wrapper()
+        wrapper.ensure_connection()
+        pool, raw = wrapper.pool, wrapper.connection
+        self.assertEqual(pool.get_stats()['in_use'], 1)
+        self.assertNotIn('pool', self.connect.call_args.kwargs)
+        wrapper.close()
+        self.assertEqual(pool.get_stats()['in_use'], 0)
+        self.assertFalse(raw.closed)
+        wrapper.ensure_connection()
+        # Соединение берётся из пула, а не открывается заново.
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_broken_connection_discarded(self):
+        wrapper = self.make_pooled_wrapper(CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        pool, broken = wrapper.pool, wrapper.connection
+        # Начало следующего запроса: соединение снова нужно проверить.
+        wrapper.close_if_unusable_or_obsolete()
+        broken.broken = True
+        wrapper.cursor().close()
+        self.assertEqual(base.stats['health_check_failures'], 1)
+        self.assertIsNot(wrapper.connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertNotIn(broken, pool._pool)
+        self.assertEqual(self.connect.call_count, 2)
+        self.assertEqual(pool.get_stats()['in_use'], 1)
+
+    def test_waits_when_exhausted(self):
+        pool = base.BlockingConnectionPool(1, 1, 5, dbname='foodgram')
+        connection = pool.getconn()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(pool.getconn()))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+        self.assertEqual(base.stats['pool_waits'], 1)
+        pool.putconn(connection)
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result, [connection])
+
+    def test_timeout_when_exhausted(self):
+        pool = base.BlockingConnectionPool(1, 1, 0.01, dbname='foodgram')
+        pool.getconn()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+        self.assertEqual(base.stats['pool_timeouts'], 1)
+        self.assertEqual(pool.get_stats()['in_use'], 1)
+
+
+class StatementTimeoutTests(PostgreSQLBackendTestCase):
+    def test_set_on_connect(self):
+        for make_wrapper in (self.make_wrapper, self.make_pooled_wrapper):
+            with self.subTest(make_wrapper.__name__):
+                wrapper = make_wrapper(STATEMENT_TIMEOUT='5000')
+                wrapper.ensure_connection()
+                self.assertIn(
+                    ('SET statement_timeout = %s', [5000]),
+                    wrapper.connection.executed)
+
+    def test_not_set_by_default(self):
+        wrapper = self.make_wrapper()
+        wrapper.ensure_connection()
+        self.assertEqual(wrapper.connection.executed, [])
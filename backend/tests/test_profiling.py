@@ -0,0 +1,37 @@
+import asyncio
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.test.client import AsyncRequestFactory
+
+from api.handlers import ReadPoolASGIHandler
+from api.profiling import profile_store
+
+
+def call_asgi(application, path):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(
+        AsyncRequestFactory().get(path).scope, receive, send))
+    return {
+        name.decode().lower(): value.decode()
+        for name, value in messages[0]['headers']}
+
+
+@override_settings(
+    MIDDLEWARE=['api.profiling.QueryProfilingMiddleware']
+    + settings.MIDDLEWARE)
+class ReadPoolProfilingTests(TransactionTestCase):
+    def test_queries_in_pool_threads_are_counted(self):
+        profile_store.clear()
+        headers = call_asgi(ReadPoolASGIHandler(), '/api/recipes/')
+        self.assertGreater(int(headers['x-query-count']), 0)
+        row, = profile_store.report()
+        self.assertEqual(row['view'], 'recipe-list')
+        self.assertGreater(row['avg_queries'], 0)
@@ -0,0 +1,44 @@
+from recipes.models import Favorite, Follow, ShoppingList
+from .base import APITestCase
+
+
+class RecipeQueriesTests(APITestCase):
+    def test_list_queries_do_not_depend_on_page_size(self):
+        recipes = self.create_recipes(10)
+        Favorite.objects.create(user=self.users[0], recipe=recipes[0])
+        ShoppingList.objects.create(user=self.users[0], recipe=recipes[1])
+        small = self.count_queries('/api/recipes/?limit=2')
+        self.assertEqual(self.count_queries('/api/recipes/?limit=10'), small)
+
+    def test_list_queries_do_not_depend_on_recipe_count(self):
+        self.create_recipes(2)
+        small = self.count_queries('/api/recipes/')
+        self.create_recipes(6, author=self.users[2])
+        self.assertEqual(self.count_queries('/api/recipes/'), small)
+
+    def test_retrieve_queries_do_not_depend_on_ingredients(self):
+        first, second = self.create_recipes(2)
+        first.recipeingredient.all().delete()
+        self.assertEqual(
+            self.count_queries(f'/api/recipes/{first.id}/'),
+            self.count_queries(f'/api/recipes/{second.id}/'))
+
+
+class SubscriptionQueriesTests(APITestCase):
+    def test_queries_do_not_depend_on_recipes_limit(self):
+        for author in self.users[1:]:
+            self.create_recipes(8, author=author)
+            Follow.objects.create(user=self.users[0], author=author)
+        url = '/api/users/subscriptions/?recipes_limit={}'
+        self.assertEqual(
+            self.count_queries(url.format(6)),
+            self.count_queries(url.format(50)))
+
+    def test_queries_do_not_depend_on_page_size(self):
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        self.create_recipes(3, author=self.users[1])
+        url = '/api/users/subscriptions/?recipes_limit=3'
+        one = self.count_queries(url)
+        Follow.objects.create(user=self.users[0], author=self.users[2])
+        self.create_recipes(3, author=self.users[2])
+        self.assertEqual(self.count_queries(url), one)
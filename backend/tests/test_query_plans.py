@@ -0,0 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from .base import APITestCase
+
+
+class QueryPlanTests(APITestCase):
+    def test_hot_queries_use_indexes(self):
+        self.create_recipes(2)
+        stdout = StringIO()
+        call_command('check_query_plans', stdout=stdout)
+        self.assertIn('Все запросы используют индексы', stdout.getvalue())
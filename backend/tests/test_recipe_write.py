@@ -0,0 +1,93 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredient
+from .base import APITestCase, image_data
+
+
+class RecipeIngredientWriteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe, = self.create_recipes(1, author=self.users[0])
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def rows(self):
+        return {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=self.recipe)}
+
+    def amounts(self):
+        return {
+            ingredient_id: row.amount
+            for ingredient_id, row in self.rows().items()}
+
+    def write_statements(self, context):
+        """INSERT, UPDATE и DELETE по таблице ингредиентов рецепта."""
+        table = connection.ops.quote_name(RecipeIngredient._meta.db_table)
+        targets = {
+            f'DELETE FROM {table}': 'DELETE',
+            f'INSERT INTO {table}': 'INSERT',
+            f'UPDATE {table}': 'UPDATE'}
+        return sorted(
+            kind for query in context for prefix, kind in targets.items()
+            if query['sql'].startswith(prefix))
+
+    def patch(self, data):
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_insert_update_delete(self):
+        first, second, _, fourth = self.ingredients[:4]
+        before = self.rows()
+        self.patch({'ingredients': [
+            {'id': first.id, 'amount': 1}, {'id': second.id, 'amount': 9},
+            {'id': fourth.id, 'amount': 4}]})
+        self.assertEqual(
+            self.amounts(), {first.id: 1, second.id: 9, fourth.id: 4})
+        after = self.rows()
+        # Оставшиеся строки обновляются на месте, а не пересоздаются.
+        self.assertEqual(after[first.id].pk, before[first.id].pk)
+        self.assertEqual(after[second.id].pk, before[second.id].pk)
+
+    def test_unchanged_ingredients_not_written(self):
+        ingredients = [
+            {'id': row.ingredient_id, 'amount': row.amount}
+            for row in self.rows().values()]
+        with CaptureQueriesContext(connection) as context:
+            self.patch({'ingredients': ingredients})
+        self.assertEqual(self.write_statements(context), [])
+
+    def test_one_statement_per_kind_of_change(self):
+        first, second, _, fourth, fifth = self.ingredients
+        with CaptureQueriesContext(connection) as context:
+            self.patch({'ingredients': [
+                {'id': first.id, 'amount': 1}, {'id': second.id, 'amount': 5},
+                {'id': fourth.id, 'amount': 4},
+                {'id': fifth.id, 'amount': 5}]})
+        self.assertEqual(
+            self.write_statements(context), ['DELETE', 'INSERT', 'UPDATE'])
+
+    def test_patch_without_tags_and_ingredients(self):
+        tags = set(self.recipe.tags.values_list('id', flat=True))
+        amounts = self.amounts()
+        self.patch({'name': 'Новое название'})
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)), tags)
+        self.assertEqual(self.amounts(), amounts)
+
+    def test_duplicate_ingredients_rejected(self):
+        ingredient = self.ingredients[0]
+        ingredients = [
+            {'id': ingredient.id, 'amount': 1},
+            {'id': ingredient.id, 'amount': 2}]
+        response = self.client.patch(
+            self.url, {'ingredients': ingredients}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        response = self.client.post('/api/recipes/', {
+            'name': 'Новый', 'text': 'Описание', 'cooking_time': 10,
+            'image': image_data(), 'tags': [self.tags[0].id],
+            'ingredients': ingredients}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
@@ -0,0 +1,46 @@
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.checks import check_shared_cache
+from recipes.models import Ingredient, Tag
+from .base import APITestCase
+
+
+class ReferenceCacheTests(APITestCase):
+    def test_cached_list_without_queries(self):
+        for url, count in (('/api/tags/', 3),
+                           ('/api/ingredients/?name=ингр', 5)):
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(len(response.json()), count)
+            self.assertEqual(len(context), 0)
+
+    def test_etag(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        self.client.get('/api/ingredients/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Новый', color='#123456', slug='new')
+            Ingredient.objects.create(name='соль', measurement_unit='г')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+        self.assertEqual(len(self.client.get('/api/ingredients/').json()), 6)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_rejected(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['recipes.E001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': 'memcached:11211'}})
+    def test_shared_cache_accepted(self):
+        self.assertEqual(check_shared_cache(None), [])
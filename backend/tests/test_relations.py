@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Follow, Recipe
+from recipes.relations import RELATIONS, cache_key
+from .base import APITestCase
+
+
+class RelationFlagsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_recipes(2)
+
+    def recipes(self, client=None):
+        response = (client or self.client).get('/api/recipes/')
+        return {recipe['id']: recipe for recipe in response.data['results']}
+
+    def test_flags(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.first.id}/favorite/')
+            self.client.post(f'/api/recipes/{self.second.id}/shopping_cart/')
+            self.client.post(f'/api/users/{self.users[1].id}/subscribe/')
+        recipes = self.recipes()
+        self.assertTrue(recipes[self.first.id]['is_favorited'])
+        self.assertFalse(recipes[self.second.id]['is_favorited'])
+        self.assertFalse(recipes[self.first.id]['is_in_shopping_cart'])
+        self.assertTrue(recipes[self.second.id]['is_in_shopping_cart'])
+        self.assertTrue(recipes[self.first.id]['author']['is_subscribed'])
+        anonymous = self.recipes(APIClient())[self.first.id]
+        self.assertFalse(anonymous['is_favorited'])
+        self.assertFalse(anonymous['author']['is_subscribed'])
+
+    def test_cached_between_requests(self):
+        self.recipes()
+        with CaptureQueriesContext(connection) as warm:
+            self.recipes()
+        for kind in RELATIONS:
+            cache.delete(cache_key(self.users[0].id, kind))
+        with CaptureQueriesContext(connection) as cold:
+            self.recipes()
+        self.assertEqual(len(cold) - len(warm), len(RELATIONS))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.first.id}/favorite/')
+        self.assertTrue(self.recipes()[self.first.id]['is_favorited'])
+        with CaptureQueriesContext(connection) as again:
+            self.recipes()
+        self.assertEqual(len(again), len(warm))
+
+
+class ToggleTests(APITestCase):
+    def test_idempotent(self):
+        recipe, = self.create_recipes(1)
+        for relation in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{recipe.id}/{relation}/'
+            self.assertEqual(self.client.post(url).status_code, 201)
+            self.assertEqual(self.client.post(url).status_code, 400)
+            self.assertEqual(self.client.delete(url).status_code, 204)
+            self.assertEqual(self.client.delete(url).status_code, 404)
+        response = self.client.post('/api/recipes/999/favorite/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_single_statement(self):
+        recipe, = self.create_recipes(1)
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(
+                f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        queries = [
+            query['sql'] for query in context
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(queries), 2, queries)
+
+    def test_batch(self):
+        first, second, third = self.create_recipes(3)
+        url = '/api/recipes/favorite/batch/'
+        response = self.client.post(
+            url, {'add': [first.id, second.id, 999]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {
+            'added': [first.id, second.id], 'removed': []})
+        response = self.client.post(url, {
+            'add': [first.id, third.id], 'remove': [second.id]},
+            format='json')
+        self.assertEqual(response.data, {
+            'added': [third.id], 'removed': [second.id]})
+        self.assertEqual(
+            dict(Recipe.objects.values_list('id', 'favorites_count')),
+            {first.id: 1, second.id: 0, third.id: 1})
+
+    def test_batch_validation(self):
+        recipe, = self.create_recipes(1)
+        url = '/api/recipes/shopping_cart/batch/'
+        for data in ({}, {'add': [recipe.id], 'remove': [recipe.id]}):
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.users[0].id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+        response = self.client.post('/api/users/999/subscribe/')
+        self.assertEqual(response.status_code, 404)
+        url = f'/api/users/{self.users[1].id}/subscribe/'
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
@@ -0,0 +1,38 @@
+from .base import APITestCase, image_data
+
+
+class RecipeSearchTests(APITestCase):
+    def create(self, name, text, ingredient):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'name': name, 'text': text, 'cooking_time': 10,
+                'image': image_data(), 'tags': [self.tags[0].id],
+                'ingredients': [{'id': ingredient.id, 'amount': 3}]},
+                format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search(self):
+        pancakes = self.create(
+            'Блины с творогом', 'Жарить', self.ingredients[0])
+        pie = self.create('Пирог', 'Блины не нужны', self.ingredients[1])
+        soup = self.create('Суп', 'Варить', self.ingredients[2])
+        self.assertEqual(self.search('блин'), [pancakes, pie])
+        self.assertEqual(self.search('блин творог'), [pancakes])
+        self.assertEqual(self.search('ингредиент 2'), [soup])
+        self.assertEqual(self.search('нет такого'), [])
+
+    def test_ingredient_rename(self):
+        soup = self.create('Суп', 'Варить', self.ingredients[2])
+        self.assertEqual(self.search('ингредиент 2'), [soup])
+        ingredient = self.ingredients[2]
+        ingredient.name = 'щавель'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertEqual(self.search('щавель'), [soup])
+        self.assertEqual(self.search('ингредиент 2'), [])
@@ -0,0 +1,41 @@
+import importlib.util
+import os
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from foodgram_backend import settings
+
+
+def load_settings(**environ):
+    """Выполняет settings.py заново с переданными переменными окружения."""
+    spec = importlib.util.spec_from_file_location(
+        'settings_under_test', settings.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(os.environ, environ):
+        for name in ('DB_POOL_MAX_SIZE', 'DB_STATEMENT_TIMEOUT',
+                     'DB_CONN_MAX_AGE'):
+            if name not in environ:
+                os.environ.pop(name, None)
+        spec.loader.exec_module(module)
+    return module
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_stock_postgresql_uses_custom_backend(self):
+        module = load_settings(DB_ENGINE='django.db.backends.postgresql')
+        self.assertEqual(
+            module.DATABASES['default']['ENGINE'],
+            'foodgram_backend.postgresql')
+        self.assertEqual(module.DATABASES['default']['CONN_MAX_AGE'], 60)
+
+    def test_other_engine_closes_connections(self):
+        module = load_settings(DB_ENGINE='django.db.backends.sqlite3')
+        self.assertEqual(module.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+    def test_options_require_custom_backend(self):
+        for name in ('DB_POOL_MAX_SIZE', 'DB_STATEMENT_TIMEOUT'):
+            with self.assertRaises(ImproperlyConfigured):
+                load_settings(
+                    DB_ENGINE='django.db.backends.sqlite3', **{name: '5'})
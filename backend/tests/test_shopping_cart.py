@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.cart import rebuild_cart_items
+from recipes.models import ShoppingCartItem
+from .base import APITestCase
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for recipe in self.create_recipes(2):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def download(self, query=''):
+        response = self.client.get(DOWNLOAD_URL + query)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_txt(self):
+        self.assertEqual(self.download(), (
+            'ингредиент 0 - 3 г\n'
+            'ингредиент 1 - 3 г\n'
+            'ингредиент 2 - 3 г\n'))
+
+    def test_csv(self):
+        self.assertIn('ингредиент 0,3,г', self.download('?format=csv'))
+
+    def test_pdf(self):
+        response = self.client.get(DOWNLOAD_URL + '?format=pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_rows_read_while_streaming(self):
+        with mock.patch.object(
+                QuerySet, 'iterator', autospec=True,
+                side_effect=QuerySet.iterator) as iterator:
+            response = self.client.get(DOWNLOAD_URL)
+            self.assertIsInstance(response, StreamingHttpResponse)
+            with CaptureQueriesContext(connection) as context:
+                body = b''.join(response.streaming_content)
+        iterator.assert_called_once()
+        self.assertEqual(len(context), 1)
+        self.assertIn(b'3', body)
+
+    def test_unknown_format(self):
+        response = self.client.get(DOWNLOAD_URL + '?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymous(self):
+        response = APIClient().get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, 401)
+
+
+class ShoppingCartItemTests(APITestCase):
+    def items(self, user=None):
+        return dict(ShoppingCartItem.objects.filter(
+            user=user or self.users[0]).values_list(
+                'ingredient__name', 'total_amount'))
+
+    def test_add_and_remove(self):
+        first, second = self.create_recipes(2)
+        for recipe in (first, second):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(self.items(), {
+            'ингредиент 0': 3, 'ингредиент 1': 3, 'ингредиент 2': 3})
+        self.client.delete(f'/api/recipes/{first.id}/shopping_cart/')
+        self.assertEqual(self.items(), {
+            'ингредиент 0': 2, 'ингредиент 1': 2, 'ингредиент 2': 2})
+
+    def test_recipe_update(self):
+        first, second = self.create_recipes(2)
+        other = APIClient()
+        other.force_authenticate(self.users[2])
+        for client in (self.client, other):
+            client.post(f'/api/recipes/{second.id}/shopping_cart/')
+        self.client.post(f'/api/recipes/{first.id}/shopping_cart/')
+        author = APIClient()
+        author.force_authenticate(self.users[1])
+        response = author.patch(f'/api/recipes/{second.id}/', {
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 10},
+                {'id': self.ingredients[4].id, 'amount': 7}]},
+            format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.items(), {
+            'ингредиент 0': 11, 'ингредиент 1': 1, 'ингредиент 2': 1,
+            'ингредиент 4': 7})
+        self.assertEqual(self.items(self.users[2]), {
+            'ингредиент 0': 10, 'ингредиент 4': 7})
+
+    def test_summary(self):
+        for recipe in self.create_recipes(2):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        response = self.client.get('/api/recipes/shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['name'], item['amount']) for item in response.data],
+            [('ингредиент 0', 3), ('ингредиент 1', 3), ('ингредиент 2', 3)])
+
+    @override_settings(TASKS={'BACKEND': 'immediate', 'MAX_ATTEMPTS': 1})
+    def test_recipe_delete(self):
+        recipe, = self.create_recipes(1)
+        self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        author = APIClient()
+        author.force_authenticate(self.users[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = author.delete(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.items(), {})
+
+    def test_rebuild(self):
+        for recipe in self.create_recipes(2):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        items = self.items()
+        ShoppingCartItem.objects.all().delete()
+        rebuild_cart_items()
+        self.assertEqual(self.items(), items)
@@ -0,0 +1,36 @@
+from recipes.counters import recount
+from recipes.models import Follow
+from .base import APITestCase
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_recipes(4, author=self.users[1])
+        self.create_recipes(2, author=self.users[2])
+        for author in self.users[1:]:
+            Follow.objects.create(user=self.users[0], author=author)
+        recount()
+
+    def authors(self, query=''):
+        response = self.client.get(SUBSCRIPTIONS_URL + query)
+        self.assertEqual(response.status_code, 200)
+        return {author['id']: author for author in response.data['results']}
+
+    def test_recipes_limit(self):
+        authors = self.authors('?recipes_limit=3')
+        first, second = authors[self.users[1].id], authors[self.users[2].id]
+        self.assertEqual(len(first['recipes']), 3)
+        self.assertEqual(first['recipes_count'], 4)
+        self.assertEqual(len(second['recipes']), 2)
+        self.assertTrue(second['is_subscribed'])
+
+    def test_without_limit(self):
+        authors = self.authors()
+        self.assertEqual(len(authors[self.users[1].id]['recipes']), 4)
+
+    def test_invalid_limit(self):
+        response = self.client.get(SUBSCRIPTIONS_URL + '?recipes_limit=x')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,37 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Tag
+from .base import APITestCase
+
+
+class TagFilterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_recipes(2)
+        self.second.tags.set([self.tags[2]])
+
+    def filter(self, *slugs):
+        response = self.client.get('/api/recipes/', {'tags': slugs})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_filter(self):
+        self.assertEqual(self.filter('tag2'), [self.second.id])
+        self.assertEqual(self.filter('tag0'), [self.first.id])
+        self.assertEqual(self.filter('unknown'), [])
+
+    def test_semi_join_without_duplicates(self):
+        self.filter('tag0')
+        with CaptureQueriesContext(connection) as context:
+            ids = self.filter('tag0', 'tag1', 'tag2')
+        self.assertEqual(ids, [self.second.id, self.first.id])
+        self.assertFalse(any(
+            'DISTINCT' in query['sql'] for query in context))
+
+    def test_new_tag(self):
+        self.assertEqual(self.filter('new'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name='Новый', color='#111111', slug='new')
+        self.first.tags.add(tag)
+        self.assertEqual(self.filter('new'), [self.first.id])
@@ -0,0 +1,86 @@
+import re
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Tag
+from tasks.models import Task
+from users import exports
+from users.emails import send_email
+from users.models import User
+
+IMMEDIATE_TASKS = {'BACKEND': 'immediate', 'MAX_ATTEMPTS': 1}
+
+
+@override_settings(TASKS=dict(
+    settings.TASKS, BACKEND='database', MAX_ATTEMPTS=2, RETRY_DELAY=0))
+class DatabaseQueueTests(TransactionTestCase):
+    def run_tasks(self):
+        stdout = StringIO()
+        call_command('run_tasks', '--once', '--workers', '1', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_task_runs_once(self):
+        send_email.delay('Тема', 'Текст', '<p>Текст</p>', 'from@example.com',
+                         ['to@example.com'])
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertIn('Выполнено задач: 1', self.run_tasks())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Текст</p>')
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_kept(self):
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send',
+                        side_effect=RuntimeError):
+            send_email.delay('Тема', 'Текст', '', 'from@example.com',
+                             ['to@example.com'])
+            self.run_tasks()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        self.assertIn('RuntimeError', task.last_error)
+
+
+@override_settings(TASKS=IMMEDIATE_TASKS)
+class QueuedSideEffectTests(TestCase):
+    def test_password_reset_email(self):
+        User.objects.create_user(
+            email='user@example.com', username='user', first_name='Имя',
+            last_name='Фамилия', password='password-123')
+        djoser = dict(
+            settings.DJOSER,
+            PASSWORD_RESET_CONFIRM_URL='reset/{uid}/{token}')
+        with override_settings(DJOSER=djoser), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                '/api/users/reset_password/', {'email': 'user@example.com'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+
+    def test_admin_export(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='Имя',
+            last_name='Фамилия', password='password-123')
+        tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        self.client.force_login(admin)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(exports, 'export_storage',
+                                  FileSystemStorage(location=directory)):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/admin/recipes/tag/', {
+                    'action': 'export_admin_action', 'file_format': '0',
+                    '_selected_action': [tag.id]}, follow=True)
+            self.assertEqual(response.status_code, 200)
+            message = str(list(response.context['messages'])[0])
+            url = re.search(r'href="([^"]+)"', message).group(1)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(
+                'Тег,#000000,tag',
+                b''.join(response.streaming_content).decode())
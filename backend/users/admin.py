@@ -1,20 +1,37 @@
+from collections import defaultdict
+from functools import partial
+
 from django.contrib import admin
 from import_export.admin import ImportExportActionModelAdmin
 
 
+from .exports import QueuedExportMixin, StreamingExportMixin
 from .forms import RecipeInLineFormSet
 from .models import User
+from recipes.bulk import (
+    RECIPE_FIELDS, RECIPE_RELATED_FIELDS, add_recipe_relations)
+from recipes.cart import update_recipe_in_carts
+from recipes.counters import update_counter
+from recipes.feed import fan_out_recipe
+from recipes.images import delete_image, schedule_recipe_image
 from recipes.models import (
     Favorite, Follow, Ingredient, Recipe, RecipeIngredient,
     RecipeTag, ShoppingList, Tag)
+from recipes.relations import (
+    RELATIONS, add_relations, delete_recipe, remove_relations)
+from recipes.search import update_search_vectors
 
 
 @admin.register(User)
-class UsersAdmin(ImportExportActionModelAdmin):
+class UsersAdmin(StreamingExportMixin, QueuedExportMixin,
+                 ImportExportActionModelAdmin):
     list_display = ('id', 'first_name', 'email')
     list_filter = ('first_name', 'email')
     search_fields = list_filter
     list_per_page = 10
+    show_full_result_count = False
+    stream_export_fields = (
+        'id', 'email', 'username', 'first_name', 'last_name', 'date_joined')
 
 
 class RecipeIngredientInLine(admin.TabularInline):
@@ -22,6 +39,10 @@ class RecipeIngredientInLine(admin.TabularInline):
     formset = RecipeInLineFormSet
     fields = ('ingredient', 'amount')
     readonly_fields = ('measurement_unit',)
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
     def measurement_unit(self, obj):
         return obj.ingredient.measurement_unit
@@ -33,41 +54,136 @@ class RecipeTagInLine(admin.TabularInline):
     formset = RecipeInLineFormSet
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tag')
+
 
 @admin.register(Recipe)
-class RecipeAdmin(ImportExportActionModelAdmin):
+class RecipeAdmin(StreamingExportMixin, QueuedExportMixin,
+                  ImportExportActionModelAdmin):
     list_display = ('name', 'get_favorite_count', 'admin_tag',
                     'author', 'cooking_time')
-    list_filter = ('tags', 'author', 'name')
+    list_filter = ('tags',)
     search_fields = ('tags__name', 'author__username', 'name')
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInLine, RecipeTagInLine)
     list_per_page = 10
+    show_full_result_count = False
+    stream_export_fields = RECIPE_FIELDS
+    stream_export_related_fields = RECIPE_RELATED_FIELDS
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author').prefetch_related('tags')
+
+    def add_related_export_data(self, rows):
+        add_recipe_relations(rows)
+
+    def get_readonly_fields(self, request, obj=None):
+        # Смена автора потребовала бы переносить счётчики и ленты.
+        if obj is not None:
+            return ('author',)
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        """Как при создании и правке рецепта через API."""
+        if change and 'image' in form.changed_data:
+            old = Recipe.objects.values_list(
+                'image', 'image_renditions').get(pk=obj.pk)
+            delete_image(*old)
+            obj.image_renditions = {}
+        super().save_model(request, obj, form, change)
+        if not change:
+            fan_out_recipe(obj)
+            update_counter(
+                User.objects.filter(id=obj.author_id), 'recipes_count', 1)
+        if not change or 'image' in form.changed_data:
+            schedule_recipe_image(obj.id)
+
+    def save_related(self, request, form, formsets, change):
+        # Состав рецепта меняется в инлайнах, списки покупок - вместе с ним.
+        update_recipe_in_carts(form.instance, partial(
+            super().save_related, request, form, formsets, change))
+        update_search_vectors(Recipe.objects.filter(pk=form.instance.pk))
+
+    def delete_model(self, request, obj):
+        delete_recipe(obj.id)
+
+    def delete_queryset(self, request, queryset):
+        for recipe_id in queryset.values_list('id', flat=True):
+            delete_recipe(recipe_id)
 
     def get_favorite_count(self, obj):
-        return obj.in_favorites.count()
+        return obj.favorites_count
 
     get_favorite_count.short_description = 'Добавлено в избранное'
+    get_favorite_count.admin_order_field = 'favorites_count'
 
 
 @admin.register(Tag)
-class TagAdmin(ImportExportActionModelAdmin):
+class TagAdmin(StreamingExportMixin, QueuedExportMixin,
+               ImportExportActionModelAdmin):
     list_display = ('name', 'color', 'slug')
     list_per_page = 10
+    stream_export_fields = ('id', 'name', 'color', 'slug')
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(ImportExportActionModelAdmin):
+class IngredientAdmin(StreamingExportMixin, QueuedExportMixin,
+                      ImportExportActionModelAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
     list_per_page = 10
+    stream_export_fields = ('id', 'name', 'measurement_unit')
+
+
+class RelationAdminMixin:
+    """Избранное, корзина и подписки меняются как через API.
+
+    Создание и удаление идут через add_relations и remove_relations,
+    которые обновляют счётчики, списки покупок, ленты и кэш связей.
+    Редактировать связь нельзя: её можно удалить и создать заново.
+    """
+
+    def get_relation(self):
+        for kind, (model, field) in RELATIONS.items():
+            if model is self.model:
+                return kind, field
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        kind, field = self.get_relation()
+        add_relations(obj.user_id, kind, [getattr(obj, field)])
+        obj.pk = self.model.objects.values_list('pk', flat=True).get(
+            user_id=obj.user_id, **{field: getattr(obj, field)})
+
+    def delete_model(self, request, obj):
+        kind, field = self.get_relation()
+        remove_relations(obj.user_id, kind, [getattr(obj, field)])
+
+    def delete_queryset(self, request, queryset):
+        kind, field = self.get_relation()
+        object_ids = defaultdict(list)
+        for user_id, object_id in queryset.values_list('user_id', field):
+            object_ids[user_id].append(object_id)
+        for user_id, ids in object_ids.items():
+            remove_relations(user_id, kind, ids)
 
 
 @admin.register(Favorite, ShoppingList)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RelationAdminMixin, admin.ModelAdmin):
     list_display = ('recipe', 'get_tags', 'user')
-    list_filter = ('recipe__tags__name', 'user')
-    search_fields = ('recipe', 'user')
+    list_filter = ('recipe__tags__name',)
+    search_fields = ('recipe__name', 'user__username')
+    autocomplete_fields = ('recipe', 'user')
     list_per_page = 10
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'user').prefetch_related('recipe__tags')
 
     def get_tags(self, obj):
         return ', '.join([tag.name for tag in obj.recipe.tags.all()])
@@ -76,7 +192,13 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(RelationAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
-    search_fields = ('user',)
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
     list_per_page = 10
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'user', 'author')
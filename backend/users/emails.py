@@ -0,0 +1,51 @@
+from django.core.mail import EmailMultiAlternatives
+from djoser import email
+
+from tasks.queue import task
+
+
+@task
+def send_email(subject, body, html, from_email, to):
+    message = EmailMultiAlternatives(subject, body or html, from_email, to)
+    if body and html:
+        message.attach_alternative(html, 'text/html')
+    elif html:
+        message.content_subtype = 'html'
+    message.send()
+
+
+class QueuedEmailMixin:
+    """Письмо рендерится в запросе, а отправляется фоновой задачей."""
+
+    def send(self, to, *args, **kwargs):
+        self.render()
+        body = '' if self.content_subtype == 'html' else self.body
+        send_email.delay(
+            self.subject, body, self.html,
+            kwargs.get('from_email', self.from_email), list(to))
+
+
+class ActivationEmail(QueuedEmailMixin, email.ActivationEmail):
+    pass
+
+
+class ConfirmationEmail(QueuedEmailMixin, email.ConfirmationEmail):
+    pass
+
+
+class PasswordResetEmail(QueuedEmailMixin, email.PasswordResetEmail):
+    pass
+
+
+class PasswordChangedConfirmationEmail(
+        QueuedEmailMixin, email.PasswordChangedConfirmationEmail):
+    pass
+
+
+class UsernameChangedConfirmationEmail(
+        QueuedEmailMixin, email.UsernameChangedConfirmationEmail):
+    pass
+
+
+class UsernameResetEmail(QueuedEmailMixin, email.UsernameResetEmail):
+    pass
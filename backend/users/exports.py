@@ -0,0 +1,164 @@
+import csv
+import json
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.module_loading import import_string
+
+from recipes.bulk import chunked
+from recipes.streaming import Echo
+from tasks.queue import task
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Файлы экспорта содержат персональные данные, поэтому лежат вне MEDIA
+# и отдаются только через админку.
+export_storage = FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+@task
+def export_records(admin_path, model_label, ids, format_index, filename):
+    """Сохраняет выбранные в админке записи в файл в хранилище."""
+    model = apps.get_model(model_label)
+    model_admin = import_string(admin_path)(model, admin.site)
+    file_format = model_admin.get_export_formats()[format_index]()
+    resource = model_admin.choose_export_resource_class(None)(
+        **model_admin.get_export_resource_kwargs(None))
+    data = file_format.export_data(
+        resource.export(queryset=model.objects.filter(pk__in=ids)),
+        escape_html=model_admin.should_escape_html,
+        escape_formulae=model_admin.should_escape_formulae)
+    if isinstance(data, str):
+        data = data.encode(model_admin.to_encoding or 'utf-8')
+    export_storage.save(filename, ContentFile(data))
+
+
+class QueuedExportMixin:
+    """Экспорт выбранных записей в фоне вместо ответа с файлом."""
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('exports/<str:token>/<str:filename>',
+                 self.admin_site.admin_view(self.download_export_view),
+                 name=f'{opts.app_label}_{opts.model_name}_export_file'),
+        ] + super().get_urls()
+
+    def download_export_view(self, request, token, filename):
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        name = f'{token}/{filename}'
+        if not export_storage.exists(name):
+            raise Http404('Файл экспорта ещё не готов.')
+        return FileResponse(
+            export_storage.open(name), as_attachment=True, filename=filename)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if 'export_admin_action' in actions:
+            _, name, description = actions['export_admin_action']
+            actions[name] = (
+                type(self).export_admin_action, name, description)
+        return actions
+
+    def export_admin_action(self, request, queryset):
+        export_format = request.POST.get('file_format')
+        if not export_format:
+            messages.warning(request, 'Выберите формат экспорта.')
+            return
+        format_index = int(export_format)
+        file_format = self.get_export_formats()[format_index]()
+        token = uuid.uuid4().hex
+        filename = self.get_export_filename(request, queryset, file_format)
+        export_records.delay(
+            f'{type(self).__module__}.{type(self).__qualname__}',
+            self.model._meta.label,
+            list(queryset.values_list('pk', flat=True)), format_index,
+            f'{token}/{filename}')
+        opts = self.model._meta
+        url = reverse(
+            f'admin:{opts.app_label}_{opts.model_name}_export_file',
+            args=(token, filename))
+        messages.success(request, format_html(
+            'Экспорт поставлен в очередь, файл появится по '
+            '<a href="{}">ссылке</a>.', url))
+
+
+def render_jsonl(rows, columns):
+    for row in rows:
+        yield json.dumps(
+            row, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+def render_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[column], ensure_ascii=False)
+            if isinstance(row[column], (list, dict)) else row[column]
+            for column in columns])
+
+
+STREAM_EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'jsonl': ('application/x-ndjson; charset=utf-8', render_jsonl),
+}
+
+
+class StreamingExportMixin:
+    """Потоковый экспорт выбранных записей в CSV и JSON Lines.
+
+    Записи читаются iterator() порциями по EXPORT_CHUNK_SIZE, связанные
+    данные порции догружает add_related_export_data, поэтому память
+    не зависит от размера таблицы.
+    """
+
+    actions = ('stream_export_csv', 'stream_export_jsonl')
+    stream_export_fields = ('id',)
+    stream_export_related_fields = ()
+
+    def add_related_export_data(self, rows):
+        pass
+
+    def iter_export_rows(self, queryset):
+        rows = queryset.order_by('pk').values(
+            *self.stream_export_fields).iterator(
+                chunk_size=EXPORT_CHUNK_SIZE)
+        for chunk in chunked(rows, EXPORT_CHUNK_SIZE):
+            self.add_related_export_data(chunk)
+            yield from chunk
+
+    def stream_export(self, queryset, export_format):
+        content_type, render = STREAM_EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            render(self.iter_export_rows(queryset),
+                   self.stream_export_fields
+                   + self.stream_export_related_fields),
+            content_type=content_type)
+        filename = (f'{self.model.__name__}-{timezone.now():%Y-%m-%d}'
+                    f'.{export_format}')
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"')
+        return response
+
+    @admin.action(
+        description='Потоковый экспорт в CSV', permissions=('export',))
+    def stream_export_csv(self, request, queryset):
+        return self.stream_export(queryset, 'csv')
+
+    @admin.action(
+        description='Потоковый экспорт в JSON Lines',
+        permissions=('export',))
+    def stream_export_jsonl(self, request, queryset):
+        return self.stream_export(queryset, 'jsonl')
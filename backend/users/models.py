@@ -34,6 +34,10 @@ class User(AbstractUser):
         help_text='Введите фамилию',
         max_length=150,
         blank=False)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков', default=0, editable=False)
 
     class Meta:
         verbose_name_plural = 'Пользователи'
@@ -1,6 +1,7 @@
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
+from recipes.relations import get_relations
 from .models import User
 
 
@@ -13,5 +14,7 @@ class CustomUserSerializer(UserSerializer):
                   'first_name', 'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, data):
-        user = self.context['request'].user.id
-        return data.following.filter(user=user).exists()
+        if hasattr(data, 'is_subscribed'):
+            return data.is_subscribed
+        return get_relations(self.context['request']).has(
+            'following', data.id)